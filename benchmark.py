@@ -0,0 +1,327 @@
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent import futures
+
+import numpy as np
+import pandas as pd
+from rich.console import Console
+
+from loaders import *
+from main import F1AsciiReplayDisplay
+from prefetch import PreparedReplay, SessionPrefetcher
+from telemetry_store import TelemetryStore
+
+TERMINAL_SIZES = [(120, 40), (200, 60), (300, 80)]
+TRACK_LENGTHS = [3000.0, 7000.0]
+SAMPLE_PERIOD = 0.2 # seconds between synthetic telemetry samples, about what fastf1's merged telemetry gives
+SYNTHETIC_DRIVERS = [('ALB', '23', 'Williams'), ('SAI', '55', 'Williams'), ('VER', '1', 'Red Bull Racing'), ('HAM', '44', 'Ferrari')]
+
+
+# ---------- Fixtures ----------
+def write_synthetic_track(database_dir, gp, length_m, spacing_m=5.0, width_m=6.0):
+    # a wobbly closed loop in the racetrack-database csv format, one point every [spacing_m] metres or so
+    n = int(length_m / spacing_m)
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = length_m / (2 * np.pi)
+    x = r * np.cos(t) + 0.25 * r * np.cos(3 * t)
+    y = 0.6 * r * np.sin(t) + 0.1 * r * np.sin(5 * t)
+    os.makedirs(os.path.join(database_dir, 'tracks'), exist_ok=True)
+    path = os.path.join(database_dir, 'tracks', f"{gp}.csv")
+    np.savetxt(path, np.column_stack((x, y, np.full(n, width_m), np.full(n, width_m))), delimiter=',', fmt='%.4f', header='x_m,y_m,w_tr_right_m,w_tr_left_m')
+    return path
+
+
+def synthetic_replay(track_data, n_laps=3, drivers=SYNTHETIC_DRIVERS, mean_speed=60.0):
+    # laps + merged telemetry for each driver going round the track, staggered a little, with the columns the panels read
+    x_track, y_track = track_data['x_m'], track_data['y_m']
+    seg = np.hypot(np.diff(x_track, append=x_track[0]), np.diff(y_track, append=y_track[0]))
+    length = seg.sum()
+    arc = np.concatenate(([0.0], np.cumsum(seg[:-1])))
+    lap_time = length / mean_speed
+    start_date = pd.Timestamp('2025-07-06 14:00:00')
+    start_time = pd.Timedelta(hours=1)
+
+    laps_by_driver = {}
+    for d, (driver, number, team) in enumerate(drivers):
+        t = np.arange(0, n_laps * lap_time, SAMPLE_PERIOD) + d * 0.7
+        k = np.arange(len(t))
+        distance = (t * mean_speed) % length
+        telemetry = pd.DataFrame({
+            'X': np.interp(distance, arc, x_track) * 10,
+            'Y': np.interp(distance, arc, y_track) * 10,
+            'Speed': 150 + 150 * np.sin(k / 50) ** 2,
+            'RPM': 8000 + 4000 * np.sin(k / 30),
+            'Throttle': (k * 7 % 101).astype(float),
+            'Brake': k % 40 < 5,
+            'nGear': k // 20 % 9,
+            'DRS': np.where(k % 100 < 20, 12, 0),
+            'Date': start_date + pd.to_timedelta(t, unit='s'),
+            'SessionTime': start_time + pd.to_timedelta(t, unit='s'),
+        })
+        lap_starts = start_time + pd.to_timedelta(np.arange(n_laps) * lap_time + d * 0.7, unit='s')
+        laps = ReplayLaps({
+            'LapNumber': np.arange(1, n_laps + 1, dtype=float),
+            'LapStartTime': lap_starts,
+            'Sector1Time': pd.to_timedelta(np.full(n_laps, lap_time * 0.3) + np.arange(n_laps) * 0.1, unit='s'),
+            'Sector2Time': pd.to_timedelta(np.full(n_laps, lap_time * 0.3) - np.arange(n_laps) * 0.1, unit='s'),
+            'Sector3Time': pd.to_timedelta(np.full(n_laps, lap_time * 0.4), unit='s'),
+            'LapTime': pd.to_timedelta(np.full(n_laps, lap_time), unit='s'),
+            'Compound': ['SOFT'] * min(2, n_laps) + ['HARD'] * max(0, n_laps - 2),
+            'TyreLife': np.arange(1, n_laps + 1, dtype=float),
+            'Stint': [1.0] * min(2, n_laps) + [2.0] * max(0, n_laps - 2),
+            'Position': np.full(n_laps, d + 1.0),
+            'Team': [team] * n_laps,
+            'DriverNumber': [number] * n_laps,
+            'Driver': [driver] * n_laps,
+        })
+        laps.telemetry = telemetry
+        laps_by_driver[driver] = laps
+
+    corner_idx = np.linspace(0, len(x_track), 8, endpoint=False).astype(int)
+    corners = pd.DataFrame({
+        'X': x_track[corner_idx] * 10,
+        'Y': y_track[corner_idx] * 10,
+        'Angle': np.arange(len(corner_idx)) * 45.0,
+        'Number': np.arange(1, len(corner_idx) + 1),
+    })
+    message_times = np.linspace(5, n_laps * lap_time - 5, 6)
+    race_control_messages = pd.DataFrame({
+        'Time': start_date + pd.to_timedelta(message_times, unit='s'),
+        'Lap': (message_times // lap_time + 1).astype(int),
+        'Message': [f"SYNTHETIC MESSAGE {n + 1}" for n in range(len(message_times))],
+    })
+    return PreparedReplay(
+        key=('synthetic', len(track_data), n_laps),
+        telemetry_store=TelemetryStore(laps_by_driver),
+        track_data=track_data,
+        corners=corners,
+        race_control_messages=race_control_messages,
+        gmt_offset=pd.Timedelta(hours=1)
+    )
+
+
+def write_synthetic_replay_cache(replay_cache_dir, gp, prepared):
+    # saves a synthetic session where TelemetryLoader looks for its replay cache, so a plain loader (e.g. one pickled over to a
+    # prefetch worker) loads it without fastf1 ever fetching anything
+    loader = TelemetryLoader(2025, gp, 'R', replay_cache_dir=replay_cache_dir)
+    for driver, laps in prepared.telemetry_store.laps_by_driver.items():
+        loader.save_replay_data(driver, ReplayData(laps, prepared.corners, prepared.race_control_messages, prepared.gmt_offset))
+    return loader
+
+
+# ---------- Timing ----------
+def _summary(latencies, allocations):
+    latencies = np.asarray(latencies) * 1e3
+    return {
+        'frames': len(latencies),
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max()),
+        'p50_alloc_kib': float(np.percentile(allocations, 50)) / 1024,
+        'max_alloc_kib': float(np.max(allocations)) / 1024,
+    }
+
+
+def _time_calls(calls, setup=None):
+    # two passes: one timed, one under tracemalloc (which slows everything down, so it's kept out of the timings).
+    # allocations are the peak extra memory while building one frame.
+    if setup:
+        setup()
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    allocations = []
+    tracemalloc.start()
+    for call in calls:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call()
+        allocations.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return _summary(latencies, allocations)
+
+
+def bench_display(display, n_frames=300):
+    # generate_frame for each panel on its own, then the whole per-frame loop (panel updates + composing the layout)
+    indices = np.linspace(0, len(display.telemetry_store) - 1, n_frames).astype(int).tolist()
+    laps = [display.lap_index.lap[i] for i in indices]
+    results = {}
+
+    panels = {
+        'DriverViewAsciiPanel': (display.driver_view_ascii_panel, [(i,) for i in indices]),
+        'TelemetryAsciiPanel': (display.telemetry_ascii_panel, [(i,) for i in indices]),
+        'LapDataAsciiPanel': (display.lap_data_ascii_panel, list(zip(laps, indices))),
+        'SectorTimingAsciiPanel': (display.sector_timing_ascii_panel, list(zip(laps, indices))),
+        'MinimapAsciiPanel': (display.minimap_ascii_panel, [(i,) for i in indices]),
+        'RaceControlMessagesAsciiPanel': (display.race_control_messages_ascii_panel, [(i,) for i in indices]),
+    }
+    for name, (panel, args) in panels.items():
+        results[name] = _time_calls([lambda panel=panel, a=a: panel.generate_frame(*a) for a in args])
+
+    console = Console(file=io.StringIO(), width=display.terminal_width, height=display.terminal_height, force_terminal=True, color_system='truecolor')
+    layout = display._build_layout()
+
+    def main_loop_frame(i):
+        display._update_panels(layout, i)
+        console.print(layout)
+        console.file.seek(0)
+        console.file.truncate()
+
+    def reset_main_loop():
+        display.panel_keys = {}
+    results['main_loop'] = _time_calls([lambda i=i: main_loop_frame(i) for i in indices], setup=reset_main_loop)
+    return results
+
+
+def _shm_blocks():
+    # shared memory blocks that currently exist. linux only - elsewhere there's nothing to check.
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+def bench_prefetch(display, telemetry_loader, racetrack_database_loader):
+    # the session loaded by a SessionPrefetcher worker and swapped into the display, as back to back replays do. the first get()
+    # times out on purpose - the session has to still be there for the next one, with no shared memory left behind afterwards.
+    before = _shm_blocks()
+    with SessionPrefetcher() as prefetcher:
+        start = time.perf_counter()
+        key = prefetcher.prefetch(telemetry_loader, racetrack_database_loader, display.drivers)
+        try:
+            prefetcher.get(key, timeout=0.001)
+            early_get_timed_out = False
+        except futures.TimeoutError:
+            early_get_timed_out = True
+        prepared = prefetcher.get(key)
+        load_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        display.load_replay(prepared, display.driver)
+        swap_ms = (time.perf_counter() - start) * 1e3
+    return {
+        'load_ms': load_ms,
+        'swap_ms': swap_ms,
+        'early_get_timed_out': early_get_timed_out,
+        'leaked_shm_blocks': len(_shm_blocks() - before),
+    }
+
+
+def run(terminal_sizes=TERMINAL_SIZES, track_lengths=TRACK_LENGTHS, n_laps=3, n_frames=300, road_mode='lines'):
+    cases = []
+    prefetch = []
+    with tempfile.TemporaryDirectory() as database_dir:
+        for track_length in track_lengths:
+            gp = f"Synthetic{int(track_length)}"
+            write_synthetic_track(database_dir, gp, track_length)
+            # no compiled store in the temp dir, so this goes through the csv path
+            racetrack_database_loader = RacetrackDatabaseLoader(gp, database_dir=database_dir)
+            track_data = racetrack_database_loader.get_track_data()
+            prepared = synthetic_replay(track_data, n_laps=n_laps)
+            for width, height in terminal_sizes:
+                setup_start = time.perf_counter()
+                display = F1AsciiReplayDisplay(None, None, terminal_width=width, terminal_height=height, road_mode=road_mode, driver=prepared.telemetry_store.drivers[0], prepared=prepared)
+                setup_ms = (time.perf_counter() - setup_start) * 1e3
+                print(f"{gp} {width}x{height}...", file=sys.stderr)
+                cases.append({
+                    'track_length_m': track_length,
+                    'track_points': len(track_data),
+                    'samples': len(prepared.telemetry_store),
+                    'terminal_width': width,
+                    'terminal_height': height,
+                    'setup_ms': setup_ms,
+                    'panels': bench_display(display, n_frames=n_frames),
+                })
+            print(f"{gp} prefetch...", file=sys.stderr)
+            telemetry_loader = write_synthetic_replay_cache(os.path.join(database_dir, 'replay_cache'), gp, prepared)
+            prefetch.append({
+                'track_length_m': track_length,
+                'samples': len(prepared.telemetry_store),
+                **bench_prefetch(display, telemetry_loader, racetrack_database_loader),
+            })
+    return {
+        'meta': {
+            'timestamp': pd.Timestamp.now(tz='UTC').isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'road_mode': road_mode,
+            'n_laps': n_laps,
+            'frames_per_case': n_frames,
+        },
+        'cases': cases,
+        'prefetch': prefetch,
+    }
+
+
+def _case_key(case):
+    return (case['track_length_m'], case['terminal_width'], case['terminal_height'])
+
+
+def compare(results, baseline, threshold=1.2, metric='p50_ms'):
+    # (case, panel, baseline, now) for everything that got more than [threshold] times slower
+    baseline_cases = {_case_key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        old = baseline_cases.get(_case_key(case))
+        if old is None:
+            continue
+        for panel, stats in case['panels'].items():
+            if panel in old['panels'] and stats[metric] > old['panels'][panel][metric] * threshold:
+                regressions.append((_case_key(case), panel, old['panels'][panel][metric], stats[metric]))
+    return regressions
+
+
+def print_results(results):
+    for case in results['cases']:
+        print(f"\n{case['track_length_m']:.0f} m track ({case['track_points']} points, {case['samples']} samples), {case['terminal_width']}x{case['terminal_height']}, setup {case['setup_ms']:.0f} ms")
+        for panel, stats in case['panels'].items():
+            print(f"  {panel:<31} p50 {stats['p50_ms']:7.3f} ms  p99 {stats['p99_ms']:7.3f} ms  alloc p50 {stats['p50_alloc_kib']:8.1f} KiB")
+    for case in results['prefetch']:
+        print(f"\n{case['track_length_m']:.0f} m track ({case['samples']} samples) prefetched: load {case['load_ms']:.0f} ms, swap {case['swap_ms']:.0f} ms, {case['leaked_shm_blocks']} shared memory blocks left behind")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Times frame generation for each panel, and the whole frame loop, on synthetic sessions.')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='earlier results json to check for regressions against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='flag anything whose p50 grew by more than this factor')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--laps', type=int, default=3)
+    parser.add_argument('--road-mode', default='lines', choices=['lines', 'filled'])
+    parser.add_argument('--quick', action='store_true', help='one terminal size and track length only')
+    args = parser.parse_args()
+
+    results = run(
+        terminal_sizes=TERMINAL_SIZES[1:2] if args.quick else TERMINAL_SIZES,
+        track_lengths=TRACK_LENGTHS[:1] if args.quick else TRACK_LENGTHS,
+        n_laps=args.laps,
+        n_frames=args.frames,
+        road_mode=args.road_mode
+    )
+    print_results(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nsaved to {args.output}")
+
+    # a get() that timed out must leave the session to be picked up later, not lose it along with its shared memory
+    leaks = [case for case in results['prefetch'] if case['leaked_shm_blocks']]
+    for case in leaks:
+        print(f"PREFETCH LEAK on {case['track_length_m']:.0f} m: {case['leaked_shm_blocks']} shared memory blocks left behind")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), threshold=args.threshold)
+        for (track_length, width, height), panel, old, new in regressions:
+            print(f"REGRESSION {panel} on {track_length:.0f} m {width}x{height}: {old:.3f} -> {new:.3f} ms")
+    sys.exit(1 if regressions or leaks else 0)
@@ -0,0 +1,112 @@
+import io
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rich.console import Console
+
+from loaders import *
+from main import F1AsciiReplayDisplay
+from playback import frame_indices
+
+# set in the parent before the pool forks, so the workers get the display without it being pickled
+_export_display = None
+_export_layout = None
+_export_console = None
+
+
+def _render_layout(display, layout, console, i):
+    display._update_panels(layout, i)
+    console.print(layout)
+    frame = console.file.getvalue()
+    console.file.seek(0)
+    console.file.truncate()
+    # home the cursor so each frame paints over the last. the final newline would scroll a terminal of exactly this height.
+    return '\x1b[H' + frame[:-1]
+
+
+def _init_worker():
+    global _export_layout, _export_console
+    _export_layout = _export_display._build_layout()
+    _export_console = Console(
+        file=io.StringIO(),
+        width=_export_display.terminal_width,
+        height=_export_display.terminal_height,
+        force_terminal=True,
+        color_system='truecolor',
+        legacy_windows=False
+    )
+
+
+def _render_chunk(first_frame, indices, frame_period):
+    # asciicast event lines for one run of consecutive frames. frames identical to the one before are left out.
+    _export_display.panel_keys = {}
+    lines = []
+    last = None
+    for n, i in enumerate(indices):
+        frame = _render_layout(_export_display, _export_layout, _export_console, i)
+        if frame != last:
+            lines.append(json.dumps([round((first_frame + n) * frame_period, 6), 'o', frame]) + '\n')
+            last = frame
+    return ''.join(lines)
+
+
+def export_asciicast(display, path, fps=30.0, speed=None, workers=None, chunk_size=240):
+    # renders the whole replay headlessly to an asciicast v2 file. chunks of frames are rendered in parallel and written
+    # in order as they come back. returns the render stats.
+    global _export_display
+    speed = display.playback_speed if speed is None else speed
+    indices = frame_indices(display.telemetry_store.session_time, fps=fps, speed=speed)
+    chunks = [(start, indices[start:start + chunk_size].tolist(), 1 / fps) for start in range(0, len(indices), chunk_size)]
+
+    started = time.monotonic()
+    # every panel's frame only depends on the sample index, so the workers can take any chunk in any order
+    _export_display = display
+
+    header = {
+        'version': 2,
+        'width': display.terminal_width,
+        'height': display.terminal_height,
+        'timestamp': int(time.time()),
+        'env': {'TERM': 'xterm-256color'},
+    }
+    n_bytes = 0
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + '\n')
+            workers = workers or os.cpu_count() or 1
+            if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'), initializer=_init_worker) as pool:
+                    for lines in pool.map(_render_chunk, *zip(*chunks)):
+                        n_bytes += f.write(lines)
+            else:
+                # no fork (e.g. windows), or asked for one worker: same thing in this process
+                _init_worker()
+                for chunk in chunks:
+                    n_bytes += f.write(_render_chunk(*chunk))
+    finally:
+        _export_display = None
+
+    elapsed = time.monotonic() - started
+    return {
+        'frames': len(indices),
+        'seconds': elapsed,
+        'fps': len(indices) / elapsed if elapsed > 0 else 0.0,
+        'realtime_factor': len(indices) / fps / elapsed if elapsed > 0 else 0.0,
+        'bytes': n_bytes,
+    }
+
+if __name__ == "__main__":
+    telemetry_loader = TelemetryLoader(2025, 'Silverstone', 'R')
+    racetrack_database_loader = RacetrackDatabaseLoader('Silverstone')
+    display = F1AsciiReplayDisplay(
+        telemetry_loader=telemetry_loader,
+        racetrack_database_loader=racetrack_database_loader,
+        terminal_width=160,
+        terminal_height=48,
+        playback_speed=1.0
+    )
+    stats = export_asciicast(display, 'replay.cast', fps=30)
+    print(f"{stats['frames']} frames in {stats['seconds']:.1f}s ({stats['fps']:.0f} fps, {stats['realtime_factor']:.1f}x realtime), {stats['bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,123 @@
+import numpy as np
+from rich.measure import Measurement
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Span, Text
+
+
+class SegmentFrame:
+    # renderable made of pre-built segments, one list per line. skips Text entirely, so nothing is parsed, sanitised or wrapped.
+    def __init__(self, lines, width):
+        self.lines = lines
+        self.width = width
+
+    def __rich_console__(self, console, options):
+        new_line = Segment.line()
+        for line in self.lines:
+            yield from line
+            yield new_line
+
+    def __rich_measure__(self, console, options):
+        return Measurement(self.width, self.width)
+
+
+class AsciiFramebuffer:
+    def __init__(self, width, height, fill=' '):
+        # one character per cell. colours etc. live in the parallel style id array rather than as markup in the cells.
+        self.width = width
+        self.height = height
+        self.fill = fill
+
+        # the extra last column holds the newlines, so the whole buffer can be serialised in one go
+        self._data = np.full((height, width + 1), fill, dtype='<U1')
+        self._data[:, -1] = '\n'
+        self.cells = self._data[:, :-1]
+
+        # parallel array of style ids into style_table. 0 is unstyled.
+        self._style_ids = np.zeros((height, width + 1), dtype=np.uint8)
+        self.style_ids = self._style_ids[:, :-1]
+        self.style_table = [None]
+        self._style_lookup = {}
+
+        self._template = self._data.copy()
+        self._style_template = self._style_ids.copy()
+
+    def style_id(self, style):
+        # registers a style string on first use. parsed once here so nothing is parsed per frame.
+        if style is None:
+            return 0
+        if style not in self._style_lookup:
+            self._style_lookup[style] = len(self.style_table)
+            self.style_table.append(Style.parse(style))
+        return self._style_lookup[style]
+
+    def save_template(self):
+        # snapshot the current contents - clear() restores to this instead of a blank buffer
+        self._template = self._data.copy()
+        self._style_template = self._style_ids.copy()
+        return self._template
+
+    def reset_template(self):
+        self.cells[:] = self.fill
+        self.style_ids[:] = 0
+        self._template = self._data.copy()
+        self._style_template = self._style_ids.copy()
+
+    def clear(self):
+        np.copyto(self._data, self._template)
+        np.copyto(self._style_ids, self._style_template)
+
+    def plot(self, rows, cols, char, style=None):
+        # vectorised scatter - anything off screen is dropped. char can be a single character or an array matching rows/cols.
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        if np.ndim(char) > 0:
+            char = np.asarray(char)[inside]
+        self.cells[rows[inside], cols[inside]] = char
+        self.style_ids[rows[inside], cols[inside]] = self.style_id(style)
+
+    def put(self, row, col, cells, style=None):
+        # writes a string (or list of characters) left to right from (row, col), clipped to the buffer.
+        # style can be one style for the whole run or a sequence of style ids, one per cell.
+        if not 0 <= row < self.height:
+            return
+        start = max(col, 0)
+        end = min(col + len(cells), self.width)
+        if start < end:
+            self.cells[row, start:end] = list(cells[start - col:end - col])
+            if style is None or isinstance(style, str):
+                self.style_ids[row, start:end] = self.style_id(style)
+            else:
+                self.style_ids[row, start:end] = style[start - col:end - col]
+
+    def to_text(self):
+        # view the buffer as one long string rather than joining cell by cell
+        return str(self._data.reshape(-1).view(f'<U{self._data.size}')[0])[:-1]
+
+    def to_rich_text(self):
+        # plain text plus one span per run of equal style ids, so rich never has to parse markup
+        text = self.to_text()
+        ids = self._style_ids.reshape(-1)[:-1]
+        breaks = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(ids)]))
+        run_ids = ids[starts]
+        styled = np.flatnonzero(run_ids)
+        return Text(text, spans=[
+            Span(int(starts[k]), int(ends[k]), self.style_table[run_ids[k]]) for k in styled
+        ])
+
+    def to_segments(self):
+        # same run-length merge as to_rich_text, but split per line into Segments
+        rows = self._data.view(f'<U{self.width + 1}').ravel()
+        ids = self.style_ids.ravel()
+        breaks = np.flatnonzero((ids[1:] != ids[:-1]) | (np.arange(1, len(ids)) % self.width == 0)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(ids)]))
+
+        lines = [[] for _ in range(self.height)]
+        for start, end, style_id in zip(starts.tolist(), ends.tolist(), ids[starts].tolist()):
+            row, col = divmod(start, self.width)
+            lines[row].append(Segment(rows[row][col:col + end - start], self.style_table[style_id]))
+        return SegmentFrame(lines, self.width)
@@ -0,0 +1,100 @@
+import os
+import sys
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import select
+    import termios
+    import tty
+
+ESCAPE_SEQUENCES = {
+    '\x1b[A': 'up',
+    '\x1b[B': 'down',
+    '\x1b[C': 'right',
+    '\x1b[D': 'left',
+    # the same arrows when the terminal's in application cursor mode
+    '\x1bOA': 'up',
+    '\x1bOB': 'down',
+    '\x1bOC': 'right',
+    '\x1bOD': 'left',
+}
+WINDOWS_KEYS = {'H': 'up', 'P': 'down', 'M': 'right', 'K': 'left'}
+
+
+def _sequence_end(text, pos):
+    # end of the escape sequence starting at text[pos], or None if it isn't one. CSI is \x1b[ then parameters up to a final
+    # byte in @-~, SS3 is \x1bO plus one byte. one cut off by the end of the read runs to the end of the text.
+    introducer = text[pos + 1:pos + 2]
+    if introducer == '[':
+        end = pos + 2
+        while end < len(text) and not '@' <= text[end] <= '~':
+            end += 1
+        return min(end + 1, len(text))
+    if introducer == 'O' and pos + 2 < len(text):
+        return pos + 3
+    return None
+
+
+def _parse(text):
+    # raw input -> key names. arrows get names, enter/escape too, everything else is passed through as the character.
+    # escape sequences for any other key (page up, ctrl+arrows, F keys...) are dropped whole, so their characters don't
+    # turn up as key presses.
+    keys = []
+    pos = 0
+    while pos < len(text):
+        end = _sequence_end(text, pos) if text[pos] == '\x1b' else None
+        if end is not None:
+            sequence = text[pos:end]
+            if sequence in ESCAPE_SEQUENCES:
+                keys.append(ESCAPE_SEQUENCES[sequence])
+            pos = end
+            continue
+        char = text[pos]
+        keys.append({'\r': 'enter', '\n': 'enter', '\x1b': 'escape'}.get(char, char))
+        pos += 1
+    return keys
+
+
+class KeyReader:
+    def __init__(self, stream=None):
+        # non-blocking key presses from the terminal, while the replay keeps drawing. does nothing if stdin isn't a terminal.
+        self.stream = stream or sys.stdin
+        self.enabled = self.stream.isatty()
+        self._saved_attributes = None
+
+    def __enter__(self):
+        if self.enabled and msvcrt is None:
+            # cbreak: keys arrive as they're pressed, without echoing over the display
+            fd = self.stream.fileno()
+            self._saved_attributes = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        return self
+
+    def __exit__(self, *exc):
+        if self._saved_attributes is not None:
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self._saved_attributes)
+            self._saved_attributes = None
+
+    def read(self):
+        # every key pressed since the last call, oldest first. never blocks.
+        if not self.enabled:
+            return []
+        if msvcrt is not None:
+            keys = []
+            while msvcrt.kbhit():
+                char = msvcrt.getwch()
+                if char in ('\x00', '\xe0'):
+                    keys.append(WINDOWS_KEYS.get(msvcrt.getwch(), ''))
+                else:
+                    keys.extend(_parse(char))
+            return keys
+        fd = self.stream.fileno()
+        data = b''
+        while select.select([fd], [], [], 0)[0]:
+            chunk = os.read(fd, 1024)
+            if not chunk:
+                break
+            data += chunk
+        return _parse(data.decode('utf-8', errors='ignore'))
@@ -0,0 +1,59 @@
+import numpy as np
+
+NAT = np.timedelta64('NaT', 'ns')
+_NO_TIME = np.iinfo(np.int64).max
+
+
+def _timedeltas(column):
+    return np.asarray(column, dtype='m8[ns]')
+
+
+def _best_before(times):
+    # best (min) time over all previous laps, NaT until there is one. NaT laps are skipped.
+    as_int = np.where(np.isnat(times), _NO_TIME, times.view(np.int64))
+    best = np.minimum.accumulate(np.concatenate(([_NO_TIME], as_int[:-1])))
+    return np.where(best == _NO_TIME, NAT, best.view('m8[ns]'))
+
+
+class LapIndex:
+    def __init__(self, laps_data, telemetry=None):
+        # everything the lap/sector panels need per telemetry sample, worked out once with searchsorted/cumulative minima
+        telemetry = laps_data.telemetry if telemetry is None else telemetry
+        session_time = _timedeltas(telemetry['SessionTime'])
+
+        # per lap
+        self.lap_numbers = laps_data['LapNumber'].to_numpy().astype(int)
+        self.lap_start_times = _timedeltas(laps_data['LapStartTime'])
+        self.sector_1_times = _timedeltas(laps_data['Sector1Time'])
+        self.sector_2_times = _timedeltas(laps_data['Sector2Time'])
+        self.sector_3_times = _timedeltas(laps_data['Sector3Time'])
+
+        # best times before each lap. the panels look these up per sample through lap_pos rather than keeping per-sample copies.
+        self.best_sector_1_before = _best_before(self.sector_1_times)
+        self.best_sector_2_before = _best_before(self.sector_2_times)
+        self.best_sector_3_before = _best_before(self.sector_3_times)
+        self.best_lap_before = _best_before(_timedeltas(laps_data['LapTime']))
+
+        # per sample. samples before the first lap start count as lap 1.
+        starts = self.lap_start_times.view(np.int64)
+        self.lap_pos = np.clip(np.searchsorted(starts, session_time.view(np.int64), side='right') - 1, 0, len(starts) - 1)
+        self.lap = self.lap_numbers[self.lap_pos]
+        # first sample of each lap, for seeking
+        self.lap_start_samples = np.minimum(np.searchsorted(session_time.view(np.int64), starts, side='left'), len(session_time) - 1)
+        self.elapsed = session_time - self.lap_start_times[self.lap_pos]
+
+        # sector 1/2/3 from the current lap's sector boundaries. a missing boundary counts as not reached yet.
+        s1 = self.sector_1_times[self.lap_pos]
+        s2 = self.sector_2_times[self.lap_pos]
+        s1_end = np.where(np.isnat(s1), _NO_TIME, s1.view(np.int64))
+        s2_end = np.where(np.isnat(s1) | np.isnat(s2), _NO_TIME, (s1 + s2).view(np.int64))
+        elapsed = self.elapsed.view(np.int64)
+        self.sector = 1 + (elapsed >= s1_end) + (elapsed >= s2_end)
+
+    def lap_start_sample(self, lap):
+        # first sample of lap number [lap], clamped to the laps there are
+        pos = min(max(int(np.searchsorted(self.lap_numbers, lap, side='left')), 0), len(self.lap_numbers) - 1)
+        return int(self.lap_start_samples[pos])
+
+    def __len__(self):
+        return len(self.lap_pos)
@@ -1,15 +1,61 @@
 
 import fastf1
+import json
 import numpy as np
 import os
+import pandas as pd
+import shutil
+
+REPLAY_CACHE_VERSION = 1
+
+class ReplayLaps(pd.DataFrame):
+    # laps table with its merged telemetry attached, standing in for fastf1's Laps once it's been through the replay cache
+    _metadata = ['telemetry']
+
+    @property
+    def _constructor(self):
+        return ReplayLaps
+
+class ReplayData:
+    def __init__(self, laps, corners, race_control_messages, gmt_offset):
+        self.laps = laps
+        self.corners = corners
+        self.race_control_messages = race_control_messages
+        self.gmt_offset = gmt_offset
+
+def _save_frame(df, path):
+    # one .npy per column so numeric columns can be memory-mapped back. anything numpy can't hold natively is pickled.
+    os.makedirs(path)
+    columns = []
+    for n, (name, column) in enumerate(df.items()):
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM':
+            np.save(os.path.join(path, f"{n}.npy"), column.to_numpy())
+        else:
+            np.save(os.path.join(path, f"{n}.npy"), column.to_numpy(dtype=object), allow_pickle=True)
+        columns.append(name)
+    with open(os.path.join(path, 'columns.json'), 'w') as f:
+        json.dump(columns, f)
+
+def _load_frame(path, cls=pd.DataFrame):
+    with open(os.path.join(path, 'columns.json')) as f:
+        columns = json.load(f)
+    data = {}
+    for n, name in enumerate(columns):
+        try:
+            data[name] = np.load(os.path.join(path, f"{n}.npy"), mmap_mode='r')
+        except ValueError:
+            # object columns can't be memory-mapped
+            data[name] = np.load(os.path.join(path, f"{n}.npy"), allow_pickle=True)
+    return cls(data)
 
 class TelemetryLoader:
-    def __init__(self, year, gp, identifier, backend='fastf1', cache_dir='./.fastf1_cache/'):
+    def __init__(self, year, gp, identifier, backend='fastf1', cache_dir='./.fastf1_cache/', replay_cache_dir='./.replay_cache/'):
         self.year = year
         self.gp = gp
         self.identifier = identifier
         self.backend = backend
         self.cache_dir = cache_dir
+        self.replay_cache_dir = replay_cache_dir
     
     def get_session(self):
         fastf1.Cache.enable_cache(self.cache_dir)
@@ -22,13 +68,181 @@ class TelemetryLoader:
         session.load()
         return session
     
+    def _replay_cache_path(self, driver):
+        key = f"{self.year}_{self.gp}_{self.identifier}_{driver}".replace(' ', '_').replace(os.sep, '_')
+        return os.path.join(self.replay_cache_dir, key)
+    
+    def build_replay_data(self, driver, session=None):
+        # the slow path: full session load plus fastf1's telemetry merge
+        session = session or self.get_session()
+        laps = session.laps.pick_drivers([driver])
+        replay_laps = ReplayLaps(laps.reset_index(drop=True))
+        replay_laps.telemetry = pd.DataFrame(laps.telemetry).reset_index(drop=True)
+        return ReplayData(
+            laps=replay_laps,
+            corners=session.get_circuit_info().corners,
+            race_control_messages=session.race_control_messages,
+            gmt_offset=session.session_info['GmtOffset']
+        )
+    
+    def save_replay_data(self, driver, replay_data):
+        path = self._replay_cache_path(driver)
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        _save_frame(replay_data.laps, os.path.join(tmp_path, 'laps'))
+        _save_frame(replay_data.laps.telemetry, os.path.join(tmp_path, 'telemetry'))
+        _save_frame(replay_data.corners, os.path.join(tmp_path, 'corners'))
+        _save_frame(replay_data.race_control_messages, os.path.join(tmp_path, 'race_control_messages'))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'version': REPLAY_CACHE_VERSION, 'gmt_offset_ns': pd.Timedelta(replay_data.gmt_offset).value}, f)
+        # swap the finished directory in, so a crash mid-write never leaves a half-written cache behind
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    
+    def load_replay_data(self, driver):
+        # None if there's no (current) cache entry for this driver
+        path = self._replay_cache_path(driver)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta.get('version') != REPLAY_CACHE_VERSION:
+            return None
+        laps = _load_frame(os.path.join(path, 'laps'), cls=ReplayLaps)
+        laps.telemetry = _load_frame(os.path.join(path, 'telemetry'))
+        return ReplayData(
+            laps=laps,
+            corners=_load_frame(os.path.join(path, 'corners')),
+            race_control_messages=_load_frame(os.path.join(path, 'race_control_messages')),
+            gmt_offset=pd.Timedelta(meta['gmt_offset_ns'])
+        )
+    
+    def get_replay_data(self, driver):
+        # session data already merged/filtered for one driver, from the replay cache if possible
+        return self.get_replay_data_for_drivers([driver])[driver]
+    
+    def get_replay_data_for_drivers(self, drivers):
+        # {driver: ReplayData}. the session is only loaded (once) if some driver isn't cached yet.
+        replay_data = {driver: self.load_replay_data(driver) if self.replay_cache_dir else None for driver in drivers}
+        missing = [driver for driver, data in replay_data.items() if data is None]
+        if missing:
+            session = self.get_session()
+            for driver in missing:
+                replay_data[driver] = self.build_replay_data(driver, session=session)
+                if self.replay_cache_dir:
+                    self.save_replay_data(driver, replay_data[driver])
+        return replay_data
+
+RACETRACK_STORE_VERSION = 1
+TRACK_FIELDS = ['x_m', 'y_m', 'w_tr_right_m', 'w_tr_left_m', 'normal_x', 'normal_y', 's_m']
+RACELINE_FIELDS = ['x_m', 'y_m', 's_m']
+
+def _read_racetrack_csv(path, n_columns):
+    # racetrack-database csvs have a commented header (or none at all), so read by position
+    return np.loadtxt(path, delimiter=',', comments='#', ndmin=2)[:, :n_columns]
+
+def _arc_length(x, y):
+    return np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+
+def _track_normals(x, y):
+    # same forward differences as the driver view, with the last point using the backward difference
+    dx = np.roll(x, -1) - x
+    dy = np.roll(y, -1) - y
+    dx[-1] = x[-1] - x[-2]
+    dy[-1] = y[-1] - y[-2]
+    lengths = np.hypot(dx, dy)
+    return -dy / lengths, dx / lengths
+
+def compile_racetrack_database(database_dir='./racetrack-database/', store_dir=None):
+    # one-off: packs every track and raceline csv into a single float64 file plus a json index, so loading a track is just a memmap view
+    store_dir = store_dir or os.path.join(database_dir, 'compiled/')
+    os.makedirs(store_dir, exist_ok=True)
+    index = {'version': RACETRACK_STORE_VERSION, 'tracks': {}, 'racelines': {}}
+    blocks = []
+    offset = 0
+    for kind, fields in (('tracks', TRACK_FIELDS), ('racelines', RACELINE_FIELDS)):
+        kind_dir = os.path.join(database_dir, kind)
+        if not os.path.isdir(kind_dir):
+            continue
+        for filename in sorted(os.listdir(kind_dir)):
+            if not filename.endswith('.csv'):
+                continue
+            raw = _read_racetrack_csv(os.path.join(kind_dir, filename), 4 if kind == 'tracks' else 2)
+            x, y = raw[:, 0], raw[:, 1]
+            if kind == 'tracks':
+                columns = [x, y, raw[:, 2], raw[:, 3], *_track_normals(x, y), _arc_length(x, y)]
+            else:
+                columns = [x, y, _arc_length(x, y)]
+            block = np.column_stack(columns)
+            index[kind][filename[:-4]] = {
+                'offset': offset,
+                'rows': len(block),
+                'bbox': [float(x.min()), float(y.min()), float(x.max()), float(y.max())],
+            }
+            blocks.append(block)
+            offset += block.nbytes
+
+    tmp_path = os.path.join(store_dir, 'racetrack-database.bin.tmp')
+    with open(tmp_path, 'wb') as f:
+        for block in blocks:
+            f.write(np.ascontiguousarray(block, dtype=np.float64).tobytes())
+    os.replace(tmp_path, os.path.join(store_dir, 'racetrack-database.bin'))
+    with open(os.path.join(store_dir, 'racetrack-database.json'), 'w') as f:
+        json.dump(index, f)
+    return index
+
+_racetrack_stores = {}
+
+def _open_racetrack_store(store_dir):
+    # (index, memmap) per store, opened once per process. None if the database hasn't been compiled.
+    if store_dir not in _racetrack_stores:
+        try:
+            with open(os.path.join(store_dir, 'racetrack-database.json')) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return None
+        if index.get('version') != RACETRACK_STORE_VERSION:
+            return None
+        data = np.memmap(os.path.join(store_dir, 'racetrack-database.bin'), dtype=np.uint8, mode='r')
+        _racetrack_stores[store_dir] = (index, data)
+    return _racetrack_stores[store_dir]
+
 class RacetrackDatabaseLoader:
-    def __init__(self, gp, database_dir='./racetrack-database/'):
+    def __init__(self, gp, database_dir='./racetrack-database/', store_dir=None):
         self.gp = gp
         self.database_dir = database_dir
+        self.store_dir = store_dir or os.path.join(database_dir, 'compiled/')
+    
+    def _from_store(self, kind, fields):
+        # structured memmap view into the compiled store - same field access as the genfromtxt arrays, plus normals/arc length
+        store = _open_racetrack_store(self.store_dir)
+        if store is None or self.gp not in store[0][kind]:
+            return None
+        index, data = store
+        entry = index[kind][self.gp]
+        dtype = np.dtype([(field, np.float64) for field in fields])
+        return data[entry['offset']:entry['offset'] + entry['rows'] * dtype.itemsize].view(dtype)
+    
+    def get_track_bounds(self):
+        # (x_min, y_min, x_max, y_max), None if the database hasn't been compiled
+        store = _open_racetrack_store(self.store_dir)
+        if store is None or self.gp not in store[0]['tracks']:
+            return None
+        return tuple(store[0]['tracks'][self.gp]['bbox'])
     
     def get_track_data(self):
+        track_data = self._from_store('tracks', TRACK_FIELDS)
+        if track_data is not None:
+            return track_data
         return np.genfromtxt(os.path.join(self.database_dir, 'tracks/', f"{self.gp}.csv"), delimiter=',', names=True, comments='#', autostrip=True)
     
     def get_raceline_data(self):
-        return np.genfromtxt(os.path.join(self.database_dir, 'reacelines/', f"{self.gp}.csv"), delimiter=',', names=True, comments='#', autostrip=True)
\ No newline at end of file
+        raceline_data = self._from_store('racelines', RACELINE_FIELDS)
+        if raceline_data is not None:
+            return raceline_data
+        return np.genfromtxt(os.path.join(self.database_dir, 'racelines/', f"{self.gp}.csv"), delimiter=',', names=True, comments='#', autostrip=True)
+
+if __name__ == "__main__":
+    compile_racetrack_database()
\ No newline at end of file
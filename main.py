@@ -1,17 +1,35 @@
 
 import math
 import shutil
+import signal
 import time
-from datetime import datetime
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
 from itertools import groupby
 
 import numpy as np
 import pandas as pd
+from framebuffer import AsciiFramebuffer, SegmentFrame
+from key_input import KeyReader
+from lap_index import LapIndex
 from loaders import *
+from pipeline import FramePipeline
+from playback import PlaybackClock
+from prefetch import prepare_replay
+from profiling import FrameProfiler
+from terminal_output import DeltaTerminalOutput
+from track_matching import follow_track, register_telemetry, track_arc_length
 from rich.layout import Layout
 from rich.live import Live
 from rich.panel import Panel
-from rich.table import Table
+from rich.segment import Segment
+from rich.style import Style
+from rich.text import Text
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 DRS_KEY = {
     0: '[bold red]OFF[/]',
@@ -21,6 +39,10 @@ DRS_KEY = {
     12: '[bold green]ON[/]',
     14: '[bold green]ON[/]',
 }
+DRS_TEXT = {key: Text.from_markup(markup) for key, markup in DRS_KEY.items()}
+
+SEEK_STEP = 10 # seconds per ←/→
+MIN_TERMINAL_SIZE = (80, 30) # columns, lines
 
 TYRE_KEY = {
     'SOFT': '#E10600',
@@ -56,19 +78,91 @@ def _generate_throttle_gradient(n_colors):
         
     return gradient_hex
 
+def _format_int(value):
+    # lap fields come through as floats, and are NaN where timing didn't record them
+    return '-' if pd.isna(value) else int(value)
+
+# timings in whole ms, with this standing in for NaT
+_NO_MS = np.iinfo(np.int64).min
+
+def _to_ms(times):
+    return np.where(np.isnat(times), _NO_MS, times.view(np.int64) // 1_000_000)
+
+def _format_ms(ms):
+    # M:SS.sss, or SS.sss under a minute
+    if ms == _NO_MS:
+        return "--.---"
+    minutes, ms = divmod(ms, 60_000)
+    if minutes > 0:
+        return f"{minutes}:{ms // 1000:02d}.{ms % 1000:03d}"
+    return f"{ms // 1000:2d}.{ms % 1000:03d}"
+
+# road shading, nearest -> furthest. index 0 is reserved for an empty cell.
+ROAD_SHADE_CHARS = np.array([' ', '#', '=', '+', '-', ':', '.'])
+
+def _fill_triangles_kernel(buf, xs, ys, shades):
+    # edge-function rasteriser. triangles are drawn in order and never overwrite a filled cell, so pass them nearest first.
+    h, w = buf.shape
+    for t in range(xs.shape[0]):
+        x1, x2, x3 = xs[t, 0], xs[t, 1], xs[t, 2]
+        y1, y2, y3 = ys[t, 0], ys[t, 1], ys[t, 2]
+        area = (x3 - x1) * (y2 - y1) - (y3 - y1) * (x2 - x1)
+        if area == 0:
+            continue
+
+        # Bounding box (clamped to screen)
+        min_x = max(0, int(math.floor(min(x1, x2, x3))))
+        max_x = min(w - 1, int(math.ceil(max(x1, x2, x3))))
+        min_y = max(0, int(math.floor(min(y1, y2, y3))))
+        max_y = min(h - 1, int(math.ceil(max(y1, y2, y3))))
+
+        for y in range(min_y, max_y + 1):
+            py = y + 0.5
+            for x in range(min_x, max_x + 1):
+                if buf[y, x] != 0:
+                    continue
+                px = x + 0.5
+                w1 = (px - x1) * (y2 - y1) - (py - y1) * (x2 - x1)
+                w2 = (px - x2) * (y3 - y2) - (py - y2) * (x3 - x2)
+                w3 = (px - x3) * (y1 - y3) - (py - y3) * (x1 - x3)
+                if (w1 >= 0 and w2 >= 0 and w3 >= 0) or (w1 <= 0 and w2 <= 0 and w3 <= 0):
+                    buf[y, x] = shades[t]
+
+def _fill_triangles_numpy(buf, xs, ys, shades):
+    # fallback for when numba isn't installed - same edge functions, vectorised over each triangle's bounding box
+    h, w = buf.shape
+    x1, x2, x3 = xs[:, 0], xs[:, 1], xs[:, 2]
+    y1, y2, y3 = ys[:, 0], ys[:, 1], ys[:, 2]
+    min_x = np.clip(np.floor(xs.min(axis=1)), 0, w - 1).astype(int)
+    max_x = np.clip(np.ceil(xs.max(axis=1)), 0, w - 1).astype(int)
+    min_y = np.clip(np.floor(ys.min(axis=1)), 0, h - 1).astype(int)
+    max_y = np.clip(np.ceil(ys.max(axis=1)), 0, h - 1).astype(int)
+
+    for t in range(len(xs)):
+        py, px = np.mgrid[min_y[t]:max_y[t] + 1, min_x[t]:max_x[t] + 1] + 0.5
+        w1 = (px - x1[t]) * (y2[t] - y1[t]) - (py - y1[t]) * (x2[t] - x1[t])
+        w2 = (px - x2[t]) * (y3[t] - y2[t]) - (py - y2[t]) * (x3[t] - x2[t])
+        w3 = (px - x3[t]) * (y1[t] - y3[t]) - (py - y3[t]) * (x1[t] - x3[t])
+        inside = ((w1 >= 0) & (w2 >= 0) & (w3 >= 0)) | ((w1 <= 0) & (w2 <= 0) & (w3 <= 0))
+        region = buf[min_y[t]:max_y[t] + 1, min_x[t]:max_x[t] + 1]
+        region[inside & (region == 0)] = shades[t]
+
+_fill_triangles = njit(cache=True)(_fill_triangles_kernel) if njit is not None else _fill_triangles_numpy
+
 class DriverViewAsciiPanel:
-    def __init__(self, panel_width, panel_height, laps_data, track_data, fov, lookahead, camera_height, horizon_y):
+    def __init__(self, panel_width, panel_height, laps_data, track_data, fov, lookahead, camera_height, horizon_y, heading_window=1, heading_smoothing=1, road_mode='lines', track_idx=None):
         self.laps_data = laps_data
         self.telemetry = laps_data.telemetry
         self.track_data = track_data
-        self.panel_width = panel_width
-        self.panel_height = panel_height
         self.fov = fov
         self.lookahead = lookahead
         self.camera_height = camera_height
         self.horizon_y = horizon_y
-        
-        self.focal_length = (self.panel_width / 2) / math.tan(math.radians(self.fov) / 2)
+        self.road_mode = road_mode # 'lines' for centre line + edges only, 'filled' to rasterise the road surface as well
+        if self.road_mode == 'filled':
+            # numba compiles the kernel on its first call (or loads it from its cache) - get that done here, not in the first frame
+            _fill_triangles(np.zeros((1, 1), dtype=np.uint8), np.zeros((1, 3)), np.zeros((1, 3)), np.ones(1, dtype=np.uint8))
+        self.resize(panel_width, panel_height)
 
         self.x_car = self.telemetry['X'].to_numpy()/10
         self.y_car = self.telemetry['Y'].to_numpy()/10
@@ -85,21 +179,85 @@ class DriverViewAsciiPanel:
         # Stack track points
         self.track_xy = np.column_stack((self.x_track, self.y_track))
 
-        # Compute forward differences (vectorised)
-        dx = np.roll(self.x_track, -1) - self.x_track
-        dy = np.roll(self.y_track, -1) - self.y_track
+        if 'normal_x' in self.track_data.dtype.names:
+            # precomputed by compile_racetrack_database
+            self.normals = np.column_stack((self.track_data['normal_x'], self.track_data['normal_y']))
+        else:
+            # Compute forward differences (vectorised)
+            dx = np.roll(self.x_track, -1) - self.x_track
+            dy = np.roll(self.y_track, -1) - self.y_track
 
-        # Avoid last-point glitch
-        dx[-1] = self.x_track[-1] - self.x_track[-2]
-        dy[-1] = self.y_track[-1] - self.y_track[-2]
+            # Avoid last-point glitch
+            dx[-1] = self.x_track[-1] - self.x_track[-2]
+            dy[-1] = self.y_track[-1] - self.y_track[-2]
 
-        # Normalise tangents
-        lengths = np.hypot(dx, dy)
-        dx /= lengths
-        dy /= lengths
+            # Normalise tangents
+            lengths = np.hypot(dx, dy)
+            dx /= lengths
+            dy /= lengths
 
-        # Normals (perpendicular)
-        self.normals = np.column_stack((-dy, dx))
+            # Normals (perpendicular)
+            self.normals = np.column_stack((-dy, dx))
+        
+        # Track edges are constant for the session, so build them once. track_points stacks centre/left/right as (3, N, 2)
+        self.left_xy = self.track_xy + self.normals * self.width_left[:, None]
+        self.right_xy = self.track_xy - self.normals * self.width_right[:, None]
+        self.track_points = np.stack((self.track_xy, self.left_xy, self.right_xy))
+        
+        self._build_pose_table(heading_window, heading_smoothing)
+        # track_idx can come precomputed from prepare_replay, which does it in the prefetch worker
+        self._build_track_index(track_idx)
+    
+    def resize(self, panel_width, panel_height):
+        # projection constants and the framebuffer are all that depend on the panel size - the pose table and track index don't
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.focal_length = (self.panel_width / 2) / math.tan(math.radians(self.fov) / 2)
+        self.centre_x = self.panel_width / 2
+        self.horizon_row = self.horizon_y * self.panel_height
+        self.framebuffer = AsciiFramebuffer(self.panel_width, self.panel_height)
+    
+    def _build_pose_table(self, window=1, smoothing=1):
+        # car heading (from the points [window] either side) and position in track co-ords for every telemetry sample, so generate_frame only has to index into it.
+        n = len(self.x_car)
+        idx = np.arange(n)
+        i0 = np.maximum(0, idx - window)
+        i1 = np.minimum(n - 1, idx + window)
+        heading = np.arctan2(self.y_car[i1] - self.y_car[i0], self.x_car[i1] - self.x_car[i0]) - math.pi/2 # only the god of coding understands why a π/2 rotation is necessary. I don't.
+        
+        if smoothing > 1 and n > 1:
+            # moving average over the unwrapped angle, edge-padded so the ends don't get dragged towards 0
+            unwrapped = np.unwrap(heading)
+            pad = smoothing // 2
+            padded = np.pad(unwrapped, (pad, smoothing - 1 - pad), mode='edge')
+            heading = np.convolve(padded, np.ones(smoothing) / smoothing, mode='valid')
+        
+        self.cam_heading = heading
+        self.cam_x, self.cam_y = self._car_to_track_co_ords(self.x_car, self.y_car)
+        self.cos_h = np.cos(-heading)
+        self.sin_h = np.sin(-heading)
+    
+    def _build_track_index(self, track_idx=None):
+        self.track_arc_length, self.track_length = track_arc_length(self.track_data)
+        n_track = len(self.x_track)
+        
+        # nearest track point for every telemetry sample, followed along the lap
+        self.track_idx = follow_track(self.cam_x, self.cam_y, self.track_data) if track_idx is None else track_idx
+        
+        # number of track points within [lookahead] metres of each track point. None -> draw the whole track.
+        if self.lookahead is None:
+            self.window_len = np.full(n_track, n_track, dtype=np.intp)
+        else:
+            arc_wrapped = np.concatenate((self.track_arc_length, self.track_arc_length + self.track_length))
+            end = np.searchsorted(arc_wrapped, self.track_arc_length + self.lookahead, side='right')
+            self.window_len = np.minimum(end - np.arange(n_track), n_track)
+        
+        # track points repeated twice so a window crossing the start line is still a plain slice
+        self.track_points_wrapped = np.concatenate((self.track_points, self.track_points), axis=1)
+    
+    def _visible_track_points(self, i):
+        j = self.track_idx[i]
+        return self.track_points_wrapped[:, j:j + self.window_len[j]]
     
     def _car_to_track_co_ords(self, car_x, car_y):
         return (
@@ -107,178 +265,88 @@ class DriverViewAsciiPanel:
             self.y_track_min + (car_y - self.y_car_min) * self.y_scale
         )
 
-    def _calculate_car_heading(self, i, window=1):
-        # takes the angle between points [window] ahead and behind of the current telemetry position. defaults to beginning/end of telemetry points.
-        i0 = max(0, i - window)
-        i1 = min(len(self.x_car) - 1, i + window)
-
-        dx = self.x_car[i1] - self.x_car[i0]
-        dy = self.y_car[i1] - self.y_car[i0]
-
-        return math.atan2(dy, dx) - math.pi/2 # only the god of coding understands why a π/2 rotation is necessary. I don't.
-    
-    def _calculate_track_heading(self, j, window=1):
-        # estimate track tangent using forward difference
-        if j < len(self.x_track) - 1:
-            dx = self.x_track[j + window] - self.x_track[j]
-            dy = self.y_track[j + window] - self.y_track[j]
-        else:
-            # default to the backward difference if we're at the end of the lap data
-            dx = self.x_track[j] - self.x_track[j - window]
-            dy = self.y_track[j] - self.y_track[j - window]
-
-        return math.atan2(dy, dx)
-
-    def _build_track_points(self, i):
-        cam_heading = self._calculate_car_heading(i, 1)
-        cam_x, cam_y = self._car_to_track_co_ords(self.x_car[i], self.y_car[i])
-
-        cos_h = math.cos(-cam_heading)
-        sin_h = math.sin(-cam_heading)
-        
-        left_xy = self.track_xy + self.normals * self.width_left[:, None]
-        right_xy = self.track_xy - self.normals * self.width_right[:, None]
-
-        def project(points):
-            dx = points[:, 0] - cam_x
-            dy = points[:, 1] - cam_y
+    def _project_visible(self, i):
+        cam_x, cam_y = self.cam_x[i], self.cam_y[i]
+        cos_h, sin_h = self.cos_h[i], self.sin_h[i]
 
-            # rotate points into camera view
-            x_rel = dx * cos_h - dy * sin_h
-            y_rel = dx * sin_h + dy * cos_h
-
-            # remove points behind camera
-            mask = y_rel > 0
-            x_rel = x_rel[mask]
-            y_rel = y_rel[mask]
-            
-            # perspective
-            inv_z = 1.0 / y_rel
-            screen_x = (self.panel_width / 2 + x_rel * inv_z * self.focal_length).astype(int)
-            screen_y = (
-                self.horizon_y * self.panel_height
-                + self.camera_height * inv_z * self.panel_height
-            ).astype(int)
-
-            valid = (
-                (screen_x >= 0) & (screen_x < self.panel_width) &
-                (screen_y >= 0) & (screen_y < self.panel_height)
-            )
-            return screen_y[valid], screen_x[valid]
-
-        cy, cx = project(self.track_xy)
-        ly, lx = project(left_xy)
-        ry, rx = project(right_xy)
-
-        return (cy, cx), (ly, lx), (ry, rx)
-
-    def _rasterise_triangle(self, buf, v1, v2, v3, char='.'):
-        h = self.panel_height
-        w = self.panel_width
-
-        x1, y1 = v1[1], v1[0]
-        x2, y2 = v2[1], v2[0]
-        x3, y3 = v3[1], v3[0]
-
-        # Bounding box (clamped to screen)
-        min_x = max(0, int(min(x1, x2, x3)))
-        max_x = min(w - 1, int(max(x1, x2, x3)))
-        min_y = max(0, int(min(y1, y2, y3)))
-        max_y = min(h - 1, int(max(y1, y2, y3)))
-
-        def edge(ax, ay, bx, by, px, py):
-            return (px - ax) * (by - ay) - (py - ay) * (bx - ax)
-
-        # Rasterise
-        for y in range(min_y, max_y + 1):
-            for x in range(min_x, max_x + 1):
-                w1 = edge(x1, y1, x2, y2, x, y)
-                w2 = edge(x2, y2, x3, y3, x, y)
-                w3 = edge(x3, y3, x1, y1, x, y)
-
-                if (w1 >= 0 and w2 >= 0 and w3 >= 0) or (w1 <= 0 and w2 <= 0 and w3 <= 0):
-                    if 0 <= y < h and 0 <= x < w:
-                        if buf[y][x] == ' ':
-                            buf[y][x] = char
-
-    def _project_points(self, points, cam_x, cam_y, cos_h, sin_h):
-        dx = points[:, 0] - cam_x
-        dy = points[:, 1] - cam_y
+        # one fused pass over the stacked (3, N, 2) centre/left/right points, culled to the lookahead window
+        points = self._visible_track_points(i)
+        dx = points[..., 0] - cam_x
+        dy = points[..., 1] - cam_y
 
+        # rotate points into camera view
         x_rel = dx * cos_h - dy * sin_h
         y_rel = dx * sin_h + dy * cos_h
 
-        mask = y_rel > 0.5
-        
-        inv_z = 1.0 / y_rel
-
-        screen_x = (self.panel_width / 2 + x_rel * inv_z * self.focal_length).astype(int)
+        # perspective. points behind the camera get a dummy depth here and are masked out by the callers using y_rel
+        inv_z = 1.0 / np.where(y_rel > 0, y_rel, 1.0)
+        screen_x = self.centre_x + x_rel * inv_z * self.focal_length
         screen_y = (
-            self.horizon_y * self.panel_height
+            self.horizon_row
             + self.camera_height * inv_z * self.panel_height
-        ).astype(int)
+        )
+        return screen_x, screen_y, y_rel
+
+    def _build_track_points(self, i):
+        screen_x, screen_y, y_rel = self._project_visible(i)
+        screen_x = screen_x.astype(int)
+        screen_y = screen_y.astype(int)
 
+        # remove points behind camera and off screen
         valid = (
-            mask &
+            (y_rel > 0) &
             (screen_x >= 0) & (screen_x < self.panel_width) &
             (screen_y >= 0) & (screen_y < self.panel_height)
         )
 
-        return screen_y, screen_x, valid
-    
-    def _plot(self, buf, r, c, char):
-        if 0 <= r < self.panel_height and 0 <= c < (self.panel_width):
-            buf[r][c] = char
+        return tuple((screen_y[k][valid[k]], screen_x[k][valid[k]]) for k in range(3))
+
+    def _rasterise_road(self, i, near_clip=0.5):
+        screen_x, screen_y, y_rel = self._project_visible(i)
+        buf = np.zeros((self.panel_height, self.panel_width), dtype=np.uint8)
+
+        # quads between consecutive left/right edge points, dropped if any corner is too close to/behind the camera
+        lx, ly, lz = screen_x[1], screen_y[1], y_rel[1]
+        rx, ry, rz = screen_x[2], screen_y[2], y_rel[2]
+        quad_ok = (lz[:-1] > near_clip) & (rz[:-1] > near_clip) & (lz[1:] > near_clip) & (rz[1:] > near_clip)
+        if not quad_ok.any():
+            return buf
+        j = np.flatnonzero(quad_ok)
+
+        # 2 triangles per quad: (L1, R1, L2) and (R1, R2, L2), nearest quads first
+        xs = np.empty((2 * len(j), 3))
+        ys = np.empty((2 * len(j), 3))
+        xs[0::2] = np.column_stack((lx[j], rx[j], lx[j + 1]))
+        ys[0::2] = np.column_stack((ly[j], ry[j], ly[j + 1]))
+        xs[1::2] = np.column_stack((rx[j], rx[j + 1], lx[j + 1]))
+        ys[1::2] = np.column_stack((ry[j], ry[j + 1], ly[j + 1]))
+
+        # shade on depth across the lookahead distance
+        max_depth = self.lookahead or self.track_length
+        n_shades = len(ROAD_SHADE_CHARS) - 1
+        shade = 1 + np.minimum((lz[j] / max_depth * n_shades).astype(int), n_shades - 1)
+        shades = np.repeat(shade, 2).astype(np.uint8)
+
+        _fill_triangles(buf, xs, ys, shades)
+        return buf
+
+    def frame_key(self, i):
+        # the view only depends on the camera pose, so a stationary car doesn't need redrawing
+        return (self.cam_x[i], self.cam_y[i], self.cam_heading[i])
     
     def generate_frame(self, i):
-        buf = [[' '] * (self.panel_width) for _ in range(self.panel_height)]
+        if self.road_mode == 'filled':
+            self.framebuffer.cells[:] = ROAD_SHADE_CHARS[self._rasterise_road(i)]
+        else:
+            self.framebuffer.clear()
         (cy, cx), (ly, lx), (ry, rx) = self._build_track_points(i)
-
-        # cam_heading = self._calculate_car_heading(i, 1)
-        # cam_x, cam_y = self._car_to_track_co_ords(self.x_car[i], self.y_car[i])
-
-        # cos_h = math.cos(-cam_heading)
-        # sin_h = math.sin(-cam_heading)
-
-        # # World points
-        # left_xy = self.track_xy + self.normals * self.width_left[:, None]
-        # right_xy = self.track_xy - self.normals * self.width_right[:, None]
-
-        # # Project ALL
-        # cy, cx, c_valid = self._project_points(self.track_xy, cam_x, cam_y, cos_h, sin_h)
-        # ly, lx, l_valid = self._project_points(left_xy, cam_x, cam_y, cos_h, sin_h)
-        # ry, rx, r_valid = self._project_points(right_xy, cam_x, cam_y, cos_h, sin_h)
-
-        # buf = [[' '] * (self.panel_width) for _ in range(self.panel_height)]
-
-        # n = len(self.track_xy)
-
-        # for j in range(n - 1):
-        #     # Skip if any of the 4 points are invalid
-        #     if not (l_valid[j] or r_valid[j] or l_valid[j+1] or r_valid[j+1]):
-        #         continue
-            
-        #     L1 = (ly[j], lx[j])
-        #     R1 = (ry[j], rx[j])
-        #     L2 = (ly[j+1], lx[j+1])
-        #     R2 = (ry[j+1], rx[j+1])
-            
-        #     # Rasterise 2 triangles
-        #     self._rasterise_triangle(buf, L1, R1, L2)
-        #     self._rasterise_triangle(buf, R1, R2, L2)
-        
         
-        # . for centre line, | for track edges
-        for r, c in zip(cy, cx):
-            self._plot(buf, r, c, '"')
-        
-        for r, c in zip(ly, lx):
-            self._plot(buf, r, c, '|')
-
-        for r, c in zip(ry, rx):
-            self._plot(buf, r, c, '|')
+        # " for centre line, | for track edges
+        self.framebuffer.plot(cy, cx, '"')
+        self.framebuffer.plot(ly, lx, '|')
+        self.framebuffer.plot(ry, rx, '|')
         
-        return '\n'.join(''.join(row) for row in buf)
+        return self.framebuffer.to_text()
 
 
 class TelemetryAsciiPanel:
@@ -304,7 +372,8 @@ class TelemetryAsciiPanel:
         self.speedometer_width = 32
         self.speedometer_height = 3
         self.speedometer_perimeter = self.speedometer_width + self.speedometer_height * 2 - 2
-        self.grid = [[" " for _ in range(self.speedometer_width)] for _ in range(self.speedometer_height)]
+        self.speedometer_framebuffer = AsciiFramebuffer(self.speedometer_width, self.speedometer_height)
+        grid = self.speedometer_framebuffer.cells
         self.path = []
         # 1. LEFT column (bottom → top)
         for y in range(self.speedometer_height - 1, 0, -1):
@@ -320,65 +389,117 @@ class TelemetryAsciiPanel:
         for i, (y, x) in enumerate(self.path):
             # Choose char based on position
             if y == 0 and x == 0:
-                self.grid[y][x] = '╭'
+                grid[y, x] = '╭'
             elif y == 0 and x == self.speedometer_width - 1:
-                self.grid[y][x] = '╮'
+                grid[y, x] = '╮'
             elif y == self.speedometer_height-1 and x == 0:
-                self.grid[y][x] = '0'
+                grid[y, x] = '0'
             elif y == self.speedometer_height-1 and x == self.speedometer_width - 1:
-                self.grid[y][x] = 'x'
+                grid[y, x] = 'x'
             elif y == 0:
-                self.grid[y][x] = '─'
+                grid[y, x] = '─'
             else:
-                self.grid[y][x] = '│'
-                
-
+                grid[y, x] = '│'
+        self.speedometer_framebuffer.save_template()
+        
+        # path as index arrays so filling is one scatter into the style ids
+        self.path_rows, self.path_cols = np.array(self.path).T
+        
+        fb = self.speedometer_framebuffer
+        self.green_style_id = fb.style_id('green')
+        self.red_style_id = fb.style_id('red')
+        self.brake_style_id = fb.style_id('#FF0000')
+        self.throttle_style_ids = [fb.style_id(f'bold {colour}') for colour in self.bar_colours]
+        
+        # the bars, gear selector and speedometer only depend on a few quantised values, so they're memoised instead of
+        # rebuilt every frame. the speedometer is cached in pieces - its border on how much of it is filled, its bottom row
+        # on throttle/brake - so only the speed text is new each frame.
+        self._rpm_bar_cache = lru_cache(maxsize=32)(self._render_rpm_bar)
+        self._gear_cache = lru_cache(maxsize=16)(self._render_gear)
+        self._speedometer_border_cache = lru_cache(maxsize=64)(self._build_speedometer_border)
+        self._throttle_row_cache = lru_cache(maxsize=128)(self._build_throttle_row)
+
+    def resize(self, panel_width, panel_height):
+        # the bars and speedometer are a fixed size, so there's nothing to rebuild
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+    
     def _render_throttle_brake_bar(self, throttle_percent, brake, bar_length=20):
-        return ['[#FF0000]<[/]']*bar_length if brake else [f'[bold {self.bar_colours[idx]}]>[/]' if idx <= throttle_percent // (100/len(self.bar_colours)) else '>' for idx in range(len(self.bar_colours))]
+        # returns the bar characters and a style id per character
+        if brake:
+            return '<'*bar_length, [self.brake_style_id]*bar_length
+        lit = throttle_percent // (100/len(self.bar_colours))
+        return '>'*len(self.bar_colours), [style_id if idx <= lit else 0 for idx, style_id in enumerate(self.throttle_style_ids)]
     
-    def _render_rpm_bar(self, rpm, bar_length=20, max_rpm=15000, rpm_red_point=10000):
+    def _render_rpm_bar(self, n_lit, bar_length=20, max_rpm=15000, rpm_red_point=10000):
         # Three sections of the bar - blue and red for the RPM and blank. 
         # Red is for above 10000RPM, chosen to estimate the "upshift" RPM value. Change this ad lib.
-        rpm_bar = f'[blue]{"●"*int(rpm/max_rpm * bar_length)}{"○"*(bar_length-int((rpm)/max_rpm * bar_length))}[/]'
-        red_index = 6 + int(rpm_red_point/max_rpm * bar_length) - 1
-        return rpm_bar[:red_index] + '[/][red]' + rpm_bar[red_index:]
+        red_index = int(rpm_red_point/max_rpm * bar_length) - 1
+        rpm_bar = Text(f'{"●"*n_lit}{"○"*(bar_length-n_lit)}')
+        rpm_bar.stylize('blue', 0, red_index)
+        rpm_bar.stylize('red', red_index)
+        return rpm_bar
     
     def _render_gear(self, n_gear):
         n_gear = str(n_gear) if n_gear != 0 else 'N'
-        return ' '.join(
-            [f'[grey]{num}[/]' if num != n_gear else f'[blue bold underline]{num}[/]'
-             for num in self.gears
-             ])
+        parts = []
+        for num in self.gears:
+            parts += [(num, 'grey' if num != n_gear else 'blue bold underline'), ' ']
+        return Text.assemble(*parts[:-1])
     
     def _accel_curve(self, p, curve_index=2):
         # 2 -> quadratic
         return 1 - (1 - p) ** curve_index
     
     def _render_speedometer(self, speed, throttle, brake):
-        # shallow copy per row
-        grid_buffer = [row[:] for row in self.grid]
         filled = int(self._accel_curve(min(speed / 350, 1)) * self.speedometer_perimeter)
-        for i, (y, x) in enumerate(self.path):
-            if i < filled:
-                grid_buffer[y][x] = f'[green]{grid_buffer[y][x]}[/]'
+        top, (left_1, right_1), (left_2, right_2) = self._speedometer_border_cache(filled)
+        # the throttle isn't shown while braking, so it's left out of the key
+        brake = bool(brake)
+        throttle_row = self._throttle_row_cache(None if brake else throttle, brake)
 
         # Speed text in center
         speed_str = f"{int(speed)} km/h"
-        cx = (self.speedometer_width - len(speed_str)) // 2
-        throttle_just = str(throttle).rjust(2, ' ')
-        throttle_brake_bar = self._render_throttle_brake_bar(throttle, brake)
-        throttle_brake_str = (
-            [' ']*5 + throttle_brake_bar + [' ', '[red]B', 'R', 'K[/]'] 
-        ) if brake else (
-            [' ', f'[green]{throttle_just[0]}', throttle_just[1], '%[/]', ' '] + throttle_brake_bar)
-        
-        for i, char in enumerate(speed_str):
-            grid_buffer[1][cx + i] = char
-
-        for i, char in enumerate(throttle_brake_str):
-            grid_buffer[2][1 + i] = char
-
-        return '\n'.join([''.join(row) for row in grid_buffer])
+        cx = (self.speedometer_width - len(speed_str)) // 2 - 1
+        speed_row = ' ' * cx + speed_str + ' ' * (self.speedometer_width - 2 - cx - len(speed_str))
+        return Text.assemble(top, '\n', left_1, speed_row, right_1, '\n', left_2, throttle_row, right_2)
+
+    def _speedometer_lines(self):
+        return self.speedometer_framebuffer.to_rich_text().split('\n')
+
+    def _build_speedometer_border(self, filled):
+        # the top line, then the border characters either side of the two lines below it
+        fb = self.speedometer_framebuffer
+        fb.clear()
+        fb.style_ids[self.path_rows[:filled], self.path_cols[:filled]] = self.green_style_id
+        top, middle, bottom = self._speedometer_lines()
+        return top, (middle[:1], middle[-1:]), (bottom[:1], bottom[-1:])
+
+    def _build_throttle_row(self, throttle, brake):
+        # the inside of the bottom line
+        fb = self.speedometer_framebuffer
+        fb.clear()
+        bar_chars, bar_styles = self._render_throttle_brake_bar(throttle, brake)
+        green, red = self.green_style_id, self.red_style_id
+        if brake:
+            fb.put(2, 1, ' '*5 + bar_chars + ' BRK', [0]*5 + bar_styles + [0, red, red, red])
+        else:
+            throttle_just = str(throttle).rjust(2, ' ')
+            fb.put(2, 1, f' {throttle_just}% ' + bar_chars, [0] + [green]*(len(throttle_just) + 1) + [0] + bar_styles)
+        return self._speedometer_lines()[2][1:-1]
+    
+    def cache_stats(self):
+        # hit rates for the memoised fragments
+        stats = {}
+        for name, cache in (('rpm_bar', self._rpm_bar_cache), ('gear', self._gear_cache), ('speedometer_border', self._speedometer_border_cache), ('throttle_row', self._throttle_row_cache)):
+            info = cache.cache_info()
+            lookups = info.hits + info.misses
+            stats[name] = {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'hit_rate': info.hits / lookups if lookups else 0.0}
+        return stats
+    
+    def frame_key(self, i):
+        # session time/date are shown to the sample, so every sample is a new frame
+        return i
     
     def generate_frame(self, i):
         speed = self.speed_arr[i]
@@ -386,155 +507,217 @@ class TelemetryAsciiPanel:
         throttle_percent = int(self.throttle_arr[i])
         brake = self.brake_arr[i]
         n_gear = self.ngear_arr[i]
-        drs = DRS_KEY[self.drs_arr[i]]
+        drs = DRS_TEXT[self.drs_arr[i]]
         date = self.date_arr[i]
         session_time = self.session_time_arr[i]
         
-        rpm_bar = self._render_rpm_bar(rpm)
+        rpm_bar = self._rpm_bar_cache(int(rpm/15000 * 20))
         speedometer = self._render_speedometer(speed, throttle_percent, brake)
-        gear_display = self._render_gear(n_gear)
+        gear_display = self._gear_cache(int(n_gear))
         
-        return f"""{speedometer} DRS: {drs}
-GEAR: {gear_display}
-RPM |{rpm_bar}| {rpm}
+        return Text.assemble(
+            speedometer, ' DRS: ', drs,
+            '\nGEAR: ', gear_display,
+            '\nRPM |', rpm_bar, f"""| {rpm}
 Session Time: {session_time}
 Date: {date}"""
+        )
 
 
 class LapDataAsciiPanel:
-    def __init__(self, panel_width, panel_height, laps_data):
+    def __init__(self, panel_width, panel_height, laps_data, lap_index=None):
         self.panel_width = panel_width
         self.panel_height = panel_height
         self.laps_data = laps_data
+        # rows are per position in the laps table, not per lap number, which needn't start at 1 or be contiguous
+        self.lap_index = lap_index if lap_index is not None else LapIndex(laps_data)
+        
+        # stints as (compound, laps) run lengths, with each complete stint's bar already formatted
+        self.stints = [(compound, len(list(group))) for compound, group in groupby(self.laps_data['Compound'].tolist())]
+        self.stint_starts = np.cumsum([0] + [length for _, length in self.stints[:-1]])
+        self.resize(panel_width, panel_height)
+        
+        # everything above the strategy line, formatted once per lap
+        self.rows = [self._format_row(lap_data) for lap_data in self.laps_data.to_dict('records')]
+    
+    def resize(self, panel_width, panel_height):
+        # the stint bars are scaled to the panel width
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.shrink_factor = (self.panel_width - 30) / len(self.laps_data)
+        self.stint_bars = [self._stint_bar(compound, length) for compound, length in self.stints]
     
-    def _tyre_strategy_diagram(self, lap):
-        compounds = list(self.laps_data['Compound'])[:lap]
-        stints = [[compound, len(list(group))] for compound, group in groupby(compounds)]
-        shrink_factor = (self.panel_width - 30) / len(self.laps_data)
-        return '|'.join(f"[{TYRE_KEY[stint[0]]}]{"█"*max(1, int(stint[1]*shrink_factor))} {stint[1]} [/]" for stint in stints)
+    def _stint_bar(self, compound, length):
+        return f"[{TYRE_KEY[compound]}]{"█"*max(1, int(length*self.shrink_factor))} {length} [/]"
     
-    def generate_frame(self, lap):
-        lap_data = self.laps_data.iloc[lap]
+    def _format_row(self, lap_data):
         return f"""[bold underline]Driver:[/] [{CONSTRUCTOR_COLOUR_KEY[lap_data['Team']]}]{lap_data['DriverNumber']} - {lap_data['Driver']} ({lap_data['Team']})[/]
-[bold underline]Lap: {lap}[/]
+[bold underline]Lap: {_format_int(lap_data['LapNumber'])}[/]
 Tyre Compound: [{TYRE_KEY[lap_data['Compound']]}]{lap_data['Compound']}[/]
-Tyre Age: {int(lap_data['TyreLife'])}
-Stint: {int(lap_data['Stint'])}
-Position: P{int(lap_data['Position'])}
-Tyre Strategy: |{self._tyre_strategy_diagram(lap=lap)}"""
+Tyre Age: {_format_int(lap_data['TyreLife'])}
+Stint: {_format_int(lap_data['Stint'])}
+Position: P{_format_int(lap_data['Position'])}
+Tyre Strategy: |"""
+    
+    def _tyre_strategy_diagram(self, pos):
+        # stints finished by the lap at [pos] in the laps table are already formatted, only the current one needs cutting short
+        n_laps = pos + 1
+        n_started = int(np.searchsorted(self.stint_starts, n_laps, side='left'))
+        if n_started == 0:
+            return ''
+        compound, length = self.stints[n_started - 1]
+        laps_in = min(length, n_laps - self.stint_starts[n_started - 1])
+        current = self.stint_bars[n_started - 1] if laps_in == length else self._stint_bar(compound, laps_in)
+        return '|'.join(self.stint_bars[:n_started - 1] + [current])
+    
+    def frame_key(self, lap, i):
+        return self.lap_index.lap_pos[i]
+    
+    def generate_frame(self, lap, i):
+        # looked up by sample like the sector timing, so the lap argument is only kept for a consistent signature
+        pos = self.lap_index.lap_pos[i]
+        return self.rows[pos] + self._tyre_strategy_diagram(pos)
 
 
 class SectorTimingAsciiPanel:
-    def __init__(self, panel_width, panel_height, laps_data):
+    def __init__(self, panel_width, panel_height, laps_data, lap_index=None):
         self.panel_width = panel_width
         self.panel_height = panel_height
         self.laps_data = laps_data
         self.telemetry = laps_data.telemetry
-    
-    def _format_time_with_colour(self, t, best):
-        if pd.isna(t):
-            return "--.---"
-        if isinstance(t, str):
-            return t
-
-        total_seconds = t.total_seconds()
-
-        minutes = int(total_seconds // 60)
-        seconds = total_seconds % 60
-
-        if minutes > 0:
-            t_str = f"{minutes}:{seconds:06.3f}"
-        else:
-            t_str = f"{seconds:6.3f}"
-        
-        if t < best or pd.isna(best):
-            return f'[bold green]{t_str}[/]'
-        else:
-            return f'[bold yellow]{t_str}[/]'
-        
-    
-    def _format_time(self, t):
-        if pd.isna(t):
-            return "--.---"
-        if isinstance(t, str):
-            return t
-
-        total_seconds = t.total_seconds()
-
-        minutes = int(total_seconds // 60)
-        seconds = total_seconds % 60
-
-        if minutes > 0:
-            t_str = f"{minutes}:{seconds:06.3f}"
-        else:
-            t_str = f"{seconds:6.3f}"
-        
-        return t_str
-        
+        self.lap_index = lap_index if lap_index is not None else LapIndex(laps_data)
+        idx = self.lap_index
+
+        # best S1/S2/S3/lap time before each lap, in ms
+        self.bests = np.stack([_to_ms(idx.best_sector_1_before), _to_ms(idx.best_sector_2_before), _to_ms(idx.best_sector_3_before), _to_ms(idx.best_lap_before)])
+
+        # per sample: the live S1/S2/S3/lap times in ms. a sector not reached yet shows nothing, the one being driven counts up,
+        # and a finished one shows its time.
+        elapsed = _to_ms(idx.elapsed)
+        s1 = _to_ms(idx.sector_1_times)[idx.lap_pos]
+        s2 = _to_ms(idx.sector_2_times)[idx.lap_pos]
+        s3 = _to_ms(idx.sector_3_times)[idx.lap_pos]
+        s3_running = (idx.sector == 3) & (s3 != _NO_MS) & (elapsed < s1 + s2 + s3)
+        self.live_ms = np.stack([
+            np.where(idx.sector == 1, elapsed, s1),
+            np.where(idx.sector == 1, _NO_MS, np.where(idx.sector == 2, elapsed - s1, s2)),
+            np.where(idx.sector < 3, _NO_MS, np.where(s3_running, elapsed - s1 - s2, s3)),
+            elapsed,
+        ], axis=1)
+        # ids into live_styles: green when it beats the best so far (or there isn't one yet), yellow otherwise
+        self.live_styles = [None, Style.parse('bold green'), Style.parse('bold yellow')]
+        best_live = self.bests.T[idx.lap_pos]
+        self.live_style_ids = np.where(self.live_ms == _NO_MS, 0, np.where((best_live == _NO_MS) | (self.live_ms < best_live), 1, 2)).astype(np.uint8)
+        self.resize(panel_width, panel_height)
+
+    def resize(self, panel_width, panel_height):
+        # drawn as fixed-width segments in the shape of a rich Table, so nothing is measured or wrapped per frame. the time
+        # columns are sized first, to fit M:SS.sss, and the labels get what's left (cropped if need be). on narrow panels the
+        # cell padding goes before the times are cut short.
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        time_width = len('M:SS.sss')
+        self.padding = 1 if self.panel_width >= 2 + 2 * time_width + 10 else 0
+        chrome = 4 + 6 * self.padding
+        self.time_width = max(1, min(time_width, (self.panel_width - chrome - 2) // 2))
+        self.label_width = max(2, self.panel_width - chrome - 2 * self.time_width)
+        widths = (self.label_width, self.time_width, self.time_width)
+        pad = ' ' * self.padding
+        bold = Style(bold=True)
+        self.header = [
+            [Segment(self._border('┏', '━', '┳', '┓', widths))],
+            [Segment(f'┃{pad}'), Segment(f"{'Sector':<{widths[0]}.{widths[0]}}", bold), Segment(f'{pad}┃{pad}'), Segment(f"{'Time':<{widths[1]}.{widths[1]}}", bold), Segment(f'{pad}┃{pad}'), Segment(f"{'Best':<{widths[2]}.{widths[2]}}", bold), Segment(f'{pad}┃')],
+            [Segment(self._border('┡', '━', '╇', '┩', widths))],
+        ]
+        self.footer = [[Segment(self._border('└', '─', '┴', '┘', widths))]]
+
+        # per lap: each row's text either side of the live time, with the best time already filled in
+        labels = [f"│{pad}{label:<{widths[0]}.{widths[0]}}{pad}│{pad}" for label in ("S1", "S2", "S3", "Lap Time")]
+        self.rows = [
+            [(label, f"{pad}│{pad}{_format_ms(best):<{widths[2]}.{widths[2]}}{pad}│") for label, best in zip(labels, bests)]
+            for bests in self.bests.T.tolist()
+        ]
+
+    def _border(self, left, fill, cross, right, widths):
+        return left + cross.join(fill * (width + 2 * self.padding) for width in widths) + right
+
+    def frame_key(self, lap, i):
+        # the live lap time is displayed to the millisecond
+        return (self.lap_index.lap_pos[i], self.lap_index.elapsed[i] // np.timedelta64(1, 'ms'))
 
     def generate_frame(self, lap, i):
-        current_telemetry_data = self.telemetry.iloc[i]
-        lap_data = self.laps_data.iloc[lap - 1]
-        lap_start_time = lap_data['LapStartTime']
-        best_sector_1_time = min(self.laps_data['Sector1Time'].iloc[:lap-1].dropna(), default=pd.NaT)
-        best_sector_2_time = min(self.laps_data['Sector2Time'].iloc[:lap-1].dropna(), default=pd.NaT)
-        best_sector_3_time = min(self.laps_data['Sector3Time'].iloc[:lap-1].dropna(), default=pd.NaT)
-        best_lap_time = min(self.laps_data['LapTime'].iloc[:lap-1].dropna(), default=pd.NaT)
-        current_lap_time = current_telemetry_data['SessionTime'] - lap_start_time
-        sector_1_time = lap_data['Sector1Time']
-        sector_2_time = lap_data['Sector2Time'] if not pd.isna(sector_1_time) else pd.NaT
-        sector_3_time = lap_data['Sector3Time'] if not pd.isna(sector_2_time) else pd.NaT
-        
-        if current_lap_time < sector_1_time:
-            sector_1_time, sector_2_time, sector_3_time = current_lap_time, pd.NaT, pd.NaT
-        elif current_lap_time < (sector_1_time + sector_2_time):
-            sector_2_time, sector_3_time = current_lap_time - sector_1_time, pd.NaT
-        elif current_lap_time < (sector_1_time + sector_2_time + sector_3_time):
-            sector_3_time = current_lap_time - sector_2_time - sector_1_time
-        
-        table = Table(expand=True)
-        table.add_column(header='Sector')
-        table.add_column(header='Time')
-        table.add_column(header='Best')
-        table.add_row("S1", self._format_time_with_colour(sector_1_time, best_sector_1_time), self._format_time(best_sector_1_time))
-        table.add_row("S2", self._format_time_with_colour(sector_2_time, best_sector_2_time), self._format_time(best_sector_2_time))
-        table.add_row("S3", self._format_time_with_colour(sector_3_time, best_sector_3_time), self._format_time(best_sector_3_time))
-        table.add_row("Lap Time", self._format_time_with_colour(current_lap_time, best_lap_time), self._format_time(best_lap_time))
-        
-        return table
+        # everything is looked up by sample, so the lap argument is only kept for a consistent signature
+        lines = []
+        for (label, best), ms, style_id in zip(self.rows[self.lap_index.lap_pos[i]], self.live_ms[i].tolist(), self.live_style_ids[i].tolist()):
+            live = _format_ms(ms)[:self.time_width]
+            lines.append([Segment(label), Segment(live, self.live_styles[style_id]), Segment(' ' * (self.time_width - len(live)) + best)])
+        return SegmentFrame(self.header + lines + self.footer, self.label_width + 2 * self.time_width + 4 + 6 * self.padding)
 
 
 class MinimapAsciiPanel:
-    def __init__(self, panel_width, panel_height, laps_data, track_data, corners=None):
+    def __init__(self, panel_width, panel_height, laps_data, track_data, corners=None, telemetry_store=None, focused_driver=None, tel_to_track=None):
         self.panel_width = panel_width
         self.panel_height = panel_height
         self.laps_data = laps_data
         self.telemetry = laps_data.telemetry
         self.track_data = track_data
         self.corners = corners
-        
-        self.track_map_cache = None
 
-        self.x_car = self.telemetry['X'].to_numpy()
-        self.y_car = self.telemetry['Y'].to_numpy()
+        # every car as (drivers, samples). without a store it's just the one car in laps_data.
+        if telemetry_store is not None:
+            self.drivers = telemetry_store.drivers
+            self.x_cars = telemetry_store.channels['X']
+            self.y_cars = telemetry_store.channels['Y']
+            self.present = telemetry_store.present
+            self.teams = [telemetry_store.laps_by_driver[driver]['Team'].iloc[0] for driver in self.drivers]
+        else:
+            self.drivers = [focused_driver]
+            self.x_cars = self.telemetry['X'].to_numpy()[None, :]
+            self.y_cars = self.telemetry['Y'].to_numpy()[None, :]
+            self.present = np.ones(self.x_cars.shape, dtype=bool)
+            self.teams = [self.laps_data['Team'].iloc[0]]
+        self.focus(focused_driver if focused_driver in self.drivers else self.drivers[0])
+        
         self.x_track = self.track_data['x_m']
         self.y_track = self.track_data['y_m']
-        
-        # Normalisation bounds
-        self.x_car_min, self.x_car_max = self.x_car.min(), self.x_car.max()
-        self.y_car_min, self.y_car_max = self.y_car.min(), self.y_car.max()
         self.x_track_min, self.x_track_max = self.x_track.min(), self.x_track.max()
         self.y_track_min, self.y_track_max = self.y_track.min(), self.y_track.max()
+        
+        # telemetry -> track metres, then everything goes through the track's screen mapping so the cars sit on the drawn circuit.
+        # fitted here unless prepare_replay already did it.
+        if tel_to_track is None:
+            tel_to_track = register_telemetry(self.x_cars[self.present], self.y_cars[self.present], self.track_data)
+        self.tel_to_track = tel_to_track
+        self.resize(panel_width, panel_height)
+
+    def resize(self, panel_width, panel_height):
+        # the registration is in track metres, so it's kept. the map and every car's screen cell are redone for the new size.
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.framebuffer = AsciiFramebuffer(self.panel_width, self.panel_height)
+        self.track_map_cache = None
+        self.car_style_ids = np.array([self.framebuffer.style_id(CONSTRUCTOR_COLOUR_KEY[team]) for team in self.teams], dtype=np.uint8)
+        self.screen_x, self.screen_y = self._tel_to_screen(self.x_cars, self.y_cars)
+        self.on_screen = self.present & (self.screen_x >= 0) & (self.screen_x < self.panel_width) & (self.screen_y >= 0) & (self.screen_y < self.panel_height)
+
+    def focus(self, driver):
+        # the focused car is drawn last so it's always on top
+        self.focused = self.drivers.index(driver)
+        self.draw_order = np.array([d for d in range(len(self.drivers)) if d != self.focused] + [self.focused])
+        self.car_chars = np.where(self.draw_order == self.focused, "●", "•")
 
     # ---------- Coordinate transforms ----------
     def _tel_to_screen(self, x, y):
-        gx = int((x - self.x_car_min) / (self.x_car_max - self.x_car_min) * (self.panel_width - 10)) + 5
-        gy = self.panel_height - 1 - int((y - self.y_car_min) / (self.y_car_max - self.y_car_min) * (self.panel_height - 6)) - 3
-        return gx, gy
+        # works on scalars or arrays
+        affine = self.tel_to_track
+        return self._track_to_screen(
+            x * affine[0, 0] + y * affine[1, 0] + affine[2, 0],
+            x * affine[0, 1] + y * affine[1, 1] + affine[2, 1]
+        )
 
     def _track_to_screen(self, x, y):
-        gx = int((x - self.x_track_min) / (self.x_track_max - self.x_track_min) * (self.panel_width - 10)) + 5
-        gy = self.panel_height - 1 - int((y - self.y_track_min) / (self.y_track_max - self.y_track_min) * (self.panel_height - 6)) - 3
+        gx = np.asarray((x - self.x_track_min) / (self.x_track_max - self.x_track_min) * (self.panel_width - 10)).astype(int) + 5
+        gy = self.panel_height - 1 - np.asarray((y - self.y_track_min) / (self.y_track_max - self.y_track_min) * (self.panel_height - 6)).astype(int) - 3
         return gx, gy
     
     def _rotate(self, xy, *, angle):
@@ -543,7 +726,7 @@ class MinimapAsciiPanel:
         
         return np.matmul(xy, rot_mat)
     
-    def _draw_corner_numbers(self, buf, corners):
+    def _draw_corner_numbers(self, fb, corners):
         for _, corner in corners.iterrows():
             cx = corner['X']
             cy = corner['Y']
@@ -562,83 +745,168 @@ class MinimapAsciiPanel:
             label = str(number)
             start_x = sx - len(label) // 2
 
-            for i, ch in enumerate(label):
-                x = start_x + i
-                if 0 <= x < self.panel_width and 0 <= sy < self.panel_height:
-                    buf[sy][x] = f"[bold yellow]{ch}[/bold yellow]"
+            fb.put(sy, start_x, label, 'bold yellow')
+
+    def _outline_cells(self):
+        # every cell on the closed centreline, joining consecutive points with straight lines so there are no gaps in it
+        cx, cy = self._track_to_screen(self.x_track, self.y_track)
+        cx, cy = np.append(cx, cx[0]), np.append(cy, cy[0])
+        dx, dy = np.diff(cx), np.diff(cy)
+        steps = np.maximum(np.maximum(np.abs(dx), np.abs(dy)), 1)
+        seg = np.repeat(np.arange(len(steps)), steps)
+        t = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / steps[seg]
+        return np.rint(cy[seg] + dy[seg] * t).astype(int), np.rint(cx[seg] + dx[seg] * t).astype(int)
+
+    def _car_cells(self, i):
+        # screen cells of every car on track at sample i, in draw order, with a mask of which ones are on screen
+        return self.screen_x[self.draw_order, i], self.screen_y[self.draw_order, i], self.on_screen[self.draw_order, i]
+
+    # ---------- Dirty checking ----------
+    def frame_key(self, i):
+        # the map is static, so only redraw when a car moves to a different cell
+        gx, gy, visible = self._car_cells(i)
+        return (self.focused, gx[visible].tobytes(), gy[visible].tobytes())
 
     # ---------- Frame generation ----------
     def generate_frame(self, i):
+        fb = self.framebuffer
         if self.track_map_cache is None:
-            buf = [[" "] * self.panel_width for _ in range(self.panel_height)]
+            fb.reset_template()
 
             # Draw track centreline
-            for k in range(len(self.x_track)):
-                cx, cy = self._track_to_screen(self.x_track[k], self.y_track[k])
-                
-                if 0 <= cx < self.panel_width and 0 <= cy < self.panel_height:
-                    buf[cy][cx] = "#"
-
-            self._draw_corner_numbers(buf, self.corners)
-            self.track_map_cache = [row[:] for row in buf]
+            fb.plot(*self._outline_cells(), "#")
+
+            self._draw_corner_numbers(fb, self.corners)
+            self.track_map_cache = fb.save_template()
         else:
-            buf = [row[:] for row in self.track_map_cache]
+            fb.clear()
 
-        # Draw car position
-        gx, gy = self._tel_to_screen(self.x_car[i], self.y_car[i])
-        if 0 <= gx < self.panel_width and 0 <= gy < self.panel_height:
-            colour = CONSTRUCTOR_COLOUR_KEY[self.laps_data['Team'].iloc[0]]
-            buf[gy][gx] = f"[{colour}]●[/]"
+        # Draw car positions, all in one go
+        gx, gy, visible = self._car_cells(i)
+        fb.cells[gy[visible], gx[visible]] = self.car_chars[visible]
+        fb.style_ids[gy[visible], gx[visible]] = self.car_style_ids[self.draw_order][visible]
 
-        return "\n".join("".join(row) for row in buf)
+        return fb.to_segments()
 
 class RaceControlMessagesAsciiPanel:
     def __init__(self, panel_width, panel_height, laps_data, race_control_messages, gmt_offset, message_time_length=300):
         self.panel_width = panel_width
         self.panel_height = panel_height
         self.laps_data = laps_data
-        self.telemetry_dates = laps_data.telemetry['Date']
         self.race_control_messages = race_control_messages
         self.gmt_offset = gmt_offset
         
-        self.message_time_length = message_time_length
+        self.message_time_length = message_time_length # in telemetry samples
+        self.max_messages = max(1, panel_height // 2) # each message takes two lines
         
-        self.message_idx = 0
-        self.last_message_frame = -1 - message_time_length
-        self.last_message_text = ""
+        # api's column names are inconsistent: the Date column in telemetry corresponds to the Time column in the race_control_messages df.
+        self.telemetry_dates = np.asarray(laps_data.telemetry['Date'], dtype='M8[ns]').view(np.int64)
+        self.message_times = np.asarray(race_control_messages['Time'], dtype='M8[ns]').view(np.int64)
+        self.message_texts = [
+            f"Lap {message_data['Lap']}, Time: {message_data['Time'] + self.gmt_offset}\n{message_data['Message']}"
+            for message_data in race_control_messages.to_dict('records')
+        ]
+        # a message shows from the first sample after it was sent, for [message_time_length] samples
+        self.message_first_sample = np.searchsorted(self.telemetry_dates, self.message_times, side='right')
+    
+    def resize(self, panel_width, panel_height):
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.max_messages = max(1, panel_height // 2)
+    
+    def _active_messages(self, i):
+        # indices of the messages on screen at sample i, newest first. stateless, so any sample can be asked for in any order.
+        newest = int(np.searchsorted(self.message_times, self.telemetry_dates[i], side='left')) - 1
+        oldest = max(0, newest - self.max_messages + 1)
+        return tuple(k for k in range(newest, oldest - 1, -1) if i < self.message_first_sample[k] + self.message_time_length)
+    
+    def frame_key(self, i):
+        return self._active_messages(i)
     
     def generate_frame(self, i):
-        telemetry_date = self.telemetry_dates.iloc[i]
-        # api's column names are inconsistent: the Date column in telemetry corresponds to the Time column in the race_control_messages df.
-        if telemetry_date > self.race_control_messages['Time'].iloc[self.message_idx]:
-            message_data = self.race_control_messages.iloc[self.message_idx]
-            self.message_idx += 1
-            self.last_message_text = f"Lap {message_data['Lap']}, Time: {message_data['Time'] + self.gmt_offset}\n{message_data['Message']}"
-            return self.last_message_text
-        elif i < self.last_message_frame + self.message_time_length:
-            return self.last_message_text
-        else:
-            return ""
+        return '\n'.join(self.message_texts[k] for k in self._active_messages(i))
+
+class PerformanceHudAsciiPanel:
+    def __init__(self, panel_width, panel_height, profiler, refresh_rate=4):
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+        self.profiler = profiler
+        self.refresh_rate = refresh_rate # times per second - redrawing it every frame would only add to what it's measuring
+        self.clock = None
+        self.pipeline = None
+    
+    def resize(self, panel_width, panel_height):
+        self.panel_width = panel_width
+        self.panel_height = panel_height
+    
+    def frame_key(self, i):
+        return int(time.monotonic() * self.refresh_rate)
+    
+    def generate_frame(self, i):
+        summary = self.profiler.summary()
+        frame = summary.get('frame', {'mean_ms': 0.0, 'p99_ms': 0.0})
+        name_width = max(8, self.panel_width - 29)
+        stats = self.clock.stats() if self.clock is not None else {'achieved_fps': 0.0, 'target_fps': 0.0, 'samples_dropped': 0, 'late_frames': 0}
+        lines = [
+            Text.assemble(
+                (f"{stats['achieved_fps']:.1f}/{stats['target_fps']:.0f} fps", 'bold'),
+                f"  frame {frame['mean_ms']:.1f} ms (p99 {frame['p99_ms']:.1f})  dropped {stats['samples_dropped']}  late {stats['late_frames']}"
+            ),
+            Text(f"{'':<{name_width}}{'gen p50':>8}{'p99':>7}{'panel':>7}{'layout':>7}", style='bold'),
+        ]
+        # one row per panel that's been drawn, in the order they first showed up
+        names = [name[:-len('.generate')] for name in summary if name.endswith('.generate')]
+        for name in names[:self.panel_height - 3]:
+            generate = summary[f'{name}.generate']
+            panel = summary.get(f'{name}.panel', {'p50_ms': 0.0})
+            layout = summary.get(f'{name}.layout', {'p50_ms': 0.0})
+            lines.append(Text(f"{name[:name_width - 1]:<{name_width}}{generate['p50_ms']:8.2f}{generate['p99_ms']:7.2f}{panel['p50_ms']:7.2f}{layout['p50_ms']:7.2f}"))
+        sleep = summary.get('sleep', {'mean_ms': 0.0})
+        queue = f"  queue {self.pipeline.fill}/{self.pipeline.depth}" if self.pipeline is not None else ''
+        lines.append(Text(f"{'sleep':<{name_width}}{sleep['mean_ms']:8.2f} mean{queue}"))
+        return Text('\n').join(lines)
 
 class F1AsciiReplayDisplay:
-    def __init__(self, telemetry_loader, racetrack_database_loader, terminal_width=None, terminal_height=None, fov=60.0, lookahead=50.0, camera_height=10, horizon_y=0.2, refresh_rate=1/30):
+    def __init__(self, telemetry_loader, racetrack_database_loader, terminal_width=None, terminal_height=None, fov=60.0, lookahead=500.0, camera_height=10, horizon_y=0.2, heading_smoothing=1, road_mode='lines', refresh_rate=1/30, playback_speed=1.0, driver='ALB', drivers=None, prepared=None, output='live', hud=False, metrics_path=None, start_lap=None, start_time=None, pipeline_depth=None):
         self.refresh_rate = refresh_rate
+        self.start_lap = start_lap
+        self.start_time = start_time
+        self.output = output # 'live' for rich's Live display, 'delta' to only write the cells that changed each frame (for slow links)
+        self.pipeline_depth = pipeline_depth # frames to render ahead on a producer thread. None renders each frame as it's shown.
+        self.pipeline = None
+        self.playback_speed = playback_speed
+        self.driver_view_options = dict(fov=fov, lookahead=lookahead, camera_height=camera_height, horizon_y=horizon_y, heading_smoothing=heading_smoothing, road_mode=road_mode)
         
-        track_data = racetrack_database_loader.get_track_data()
-        session = telemetry_loader.get_session()
-        session.load()
-        self.laps_data = session.laps.pick_drivers(['ALB'])
-        self.laps_data.reset_index(drop=True)
-        corners = session.get_circuit_info().corners
-        race_control_messages = session.race_control_messages
-        gmt_offset = session.session_info['GmtOffset']
+        # a size given here is kept - otherwise it follows the terminal, including when it's resized mid-replay
+        self.fixed_terminal_size = (terminal_width, terminal_height)
+        self.hud = hud
+        self.terminal_width, self.terminal_height = self._terminal_size()
+        self._size_panels()
         
+        # per-frame timings, only collected if something's going to show them
+        self.profiler = FrameProfiler(window=int(1/refresh_rate) * 5, metrics_path=metrics_path) if hud or metrics_path else None
+        self.hud_ascii_panel = PerformanceHudAsciiPanel(self.hud_ascii_panel_width, self.hud_ascii_panel_height, self.profiler) if hud else None
+        
+        # prepared comes from SessionPrefetcher.get() when the session was loaded in the background. otherwise load it now.
+        if prepared is None:
+            drivers = list(drivers) if drivers else [driver]
+            if driver not in drivers:
+                drivers.insert(0, driver)
+            prepared = prepare_replay(telemetry_loader, racetrack_database_loader, drivers)
+        self.load_replay(prepared, driver)
+    
+    def _terminal_size(self):
+        # never smaller than MIN_TERMINAL_SIZE, below which the panels don't fit
+        width, height = shutil.get_terminal_size()
+        return (
+            self.fixed_terminal_size[0] or max(width, MIN_TERMINAL_SIZE[0]),
+            self.fixed_terminal_size[1] or max(height, MIN_TERMINAL_SIZE[1])
+        )
+    
+    def _size_panels(self):
         # These dimensions have been mostly judged arbitrarily in terms of ratios - the 8 line high windows are to match the amount of space the given data takes up, 
         # and the subtractions are for border thicknesses. The exact workings on this I'm lost on, blame Rich.
         
-        self.terminal_width = terminal_width or (shutil.get_terminal_size()[0])
-        self.terminal_height = terminal_height or (shutil.get_terminal_size()[1])
-        
         self.race_control_messages_ascii_panel_width = int((self.terminal_width) * 0.65) - 4
         self.race_control_messages_ascii_panel_height = 4
         
@@ -654,55 +922,171 @@ class F1AsciiReplayDisplay:
         self.sector_timing_ascii_panel_width = self.terminal_width - self.race_control_messages_ascii_panel_width - 8
         self.sector_timing_ascii_panel_height = 8
         
+        self.hud_ascii_panel_width = self.terminal_width - self.race_control_messages_ascii_panel_width - 8
+        self.hud_ascii_panel_height = 10 if self.hud else 0
+        
         self.minimap_ascii_panel_width = self.terminal_width - self.race_control_messages_ascii_panel_width - 8
-        self.minimap_ascii_panel_height = self.terminal_height - self.sector_timing_ascii_panel_height - 4
+        self.minimap_ascii_panel_height = self.terminal_height - self.sector_timing_ascii_panel_height - 4 - (self.hud_ascii_panel_height + 2 if self.hud else 0)
+    
+    def resize(self, terminal_width=None, terminal_height=None):
+        # re-fits every panel to a new terminal size (the terminal's current one by default). only the size-dependent state is
+        # rebuilt - no data is reloaded and nothing is re-registered, so it fits between two frames. False if nothing changed.
+        current_width, current_height = self._terminal_size()
+        size = (terminal_width or current_width, terminal_height or current_height)
+        if size == (self.terminal_width, self.terminal_height):
+            return False
+        self.terminal_width, self.terminal_height = size
+        self._size_panels()
+        
+        for laps_data, lap_index, driver_view_ascii_panel, telemetry_ascii_panel, lap_data_ascii_panel, sector_timing_ascii_panel in self.driver_panels.values():
+            driver_view_ascii_panel.resize(self.driver_view_ascii_panel_width, self.driver_view_ascii_panel_height)
+            telemetry_ascii_panel.resize(self.telemetry_ascii_panel_width, self.telemetry_ascii_panel_height)
+            lap_data_ascii_panel.resize(self.lap_data_ascii_panel_width, self.lap_data_ascii_panel_height)
+            sector_timing_ascii_panel.resize(self.sector_timing_ascii_panel_width, self.sector_timing_ascii_panel_height)
+        self.minimap_ascii_panel.resize(self.minimap_ascii_panel_width, self.minimap_ascii_panel_height)
+        self.race_control_messages_ascii_panel.resize(self.race_control_messages_ascii_panel_width, self.race_control_messages_ascii_panel_height)
+        if self.hud_ascii_panel is not None:
+            self.hud_ascii_panel.resize(self.hud_ascii_panel_width, self.hud_ascii_panel_height)
+        # everything needs redrawing at the new size
+        self.panel_keys = {}
+        return True
+    
+    @contextmanager
+    def _resize_signal(self):
+        # SIGWINCH only flags the resize, it's picked up at the start of the next frame. not available on windows, nor off
+        # the main thread, in which case the size just stays as it was.
+        self.resize_pending = False
+        previous = None
+        if hasattr(signal, 'SIGWINCH') and None in self.fixed_terminal_size:
+            def on_resize(signum, frame):
+                self.resize_pending = True
+            try:
+                previous = signal.signal(signal.SIGWINCH, on_resize)
+            except ValueError:
+                pass
+        try:
+            yield
+        finally:
+            if previous is not None:
+                signal.signal(signal.SIGWINCH, previous)
+    
+    def load_replay(self, prepared, driver=None):
+        # swaps in another session's data (e.g. the next race from a SessionPrefetcher). only the panels are rebuilt, nothing is loaded.
+        self.prepared = prepared
+        # every driver's telemetry resampled onto one shared time grid, so sample i is the same moment for all of them
+        self.telemetry_store = prepared.telemetry_store
+        self.drivers = self.telemetry_store.drivers
+        self.track_data = prepared.track_data
+        driver = driver if driver in self.drivers else self.drivers[0]
+        
+        # every selected driver's panels are built now rather than on first focus, so switching drivers mid-replay is free.
+        # the slow part (matching each car onto the track) already came from prepare_replay.
+        self.driver_panels = {d: self._build_driver_panels(d) for d in self.drivers}
+        self.minimap_ascii_panel = None
+        self.focus_driver(driver)
+        
+        self.minimap_ascii_panel = MinimapAsciiPanel(
+            panel_width=self.minimap_ascii_panel_width,
+            panel_height=self.minimap_ascii_panel_height,
+            laps_data=self.laps_data,
+            track_data=self.track_data,
+            corners=prepared.corners,
+            telemetry_store=self.telemetry_store,
+            focused_driver=driver,
+            tel_to_track=prepared.tel_to_track
+        )
+        
+        self.race_control_messages_ascii_panel = RaceControlMessagesAsciiPanel(
+            panel_width=self.race_control_messages_ascii_panel_width,
+            panel_height=self.race_control_messages_ascii_panel_height,
+            laps_data=self.laps_data,
+            race_control_messages=prepared.race_control_messages,
+            gmt_offset=prepared.gmt_offset
+        )
+    
+    def _build_driver_panels(self, driver):
+        laps_data = self.telemetry_store.laps(driver)
+        lap_index = LapIndex(laps_data)
         
-        self.driver_view_ascii_panel = DriverViewAsciiPanel(
+        driver_view_ascii_panel = DriverViewAsciiPanel(
             panel_width=self.driver_view_ascii_panel_width,
             panel_height=self.driver_view_ascii_panel_height,
-            laps_data=self.laps_data,
-            track_data=track_data,
-            fov=fov,
-            lookahead=lookahead,
-            camera_height=camera_height,
-            horizon_y=horizon_y
+            laps_data=laps_data,
+            track_data=self.track_data,
+            track_idx=(self.prepared.track_idx or {}).get(driver),
+            **self.driver_view_options
         )
         
-        self.telemetry_ascii_panel = TelemetryAsciiPanel(
+        telemetry_ascii_panel = TelemetryAsciiPanel(
             panel_width=self.telemetry_ascii_panel_width,
             panel_height=self.telemetry_ascii_panel_height,
-            laps_data=self.laps_data
+            laps_data=laps_data
         )
         
-        self.lap_data_ascii_panel = LapDataAsciiPanel(
+        lap_data_ascii_panel = LapDataAsciiPanel(
             panel_width=self.lap_data_ascii_panel_width,
             panel_height=self.lap_data_ascii_panel_height,
-            laps_data=self.laps_data,
+            laps_data=laps_data,
+            lap_index=lap_index
         )
         
-        self.sector_timing_ascii_panel = SectorTimingAsciiPanel(
+        sector_timing_ascii_panel = SectorTimingAsciiPanel(
             panel_width=self.sector_timing_ascii_panel_width,
             panel_height=self.sector_timing_ascii_panel_height,
-            laps_data=self.laps_data
-        )
-        
-        self.minimap_ascii_panel = MinimapAsciiPanel(
-            panel_width=self.minimap_ascii_panel_width,
-            panel_height=self.minimap_ascii_panel_height,
-            laps_data=self.laps_data,
-            track_data=track_data,
-            corners=corners
+            laps_data=laps_data,
+            lap_index=lap_index
         )
+        return laps_data, lap_index, driver_view_ascii_panel, telemetry_ascii_panel, lap_data_ascii_panel, sector_timing_ascii_panel
+    
+    def focus_driver(self, driver):
+        (
+            self.laps_data,
+            self.lap_index,
+            self.driver_view_ascii_panel,
+            self.telemetry_ascii_panel,
+            self.lap_data_ascii_panel,
+            self.sector_timing_ascii_panel
+        ) = self.driver_panels[driver]
+        self.driver = driver
+        if self.minimap_ascii_panel is not None:
+            self.minimap_ascii_panel.focus(driver)
+        # everything needs redrawing for the new driver
+        self.panel_keys = {}
+    
+    def _render_panel(self, name, title, panel, width, height, *args):
+        # the panel's next Panel, or None if its change key hasn't moved since the last one (so there's nothing to redo)
+        key = panel.frame_key(*args)
+        if key is not None and name in self.panel_keys and self.panel_keys[name] == key:
+            return None
         
-        self.race_control_messages_ascii_panel = RaceControlMessagesAsciiPanel(
-            panel_width=self.race_control_messages_ascii_panel_width,
-            panel_height=self.race_control_messages_ascii_panel_height,
-            laps_data=self.laps_data,
-            race_control_messages=race_control_messages,
-            gmt_offset=gmt_offset
-        )
+        start = time.perf_counter()
+        frame = panel.generate_frame(*args)
+        generated = time.perf_counter()
+        rendered = Panel(frame, title=title, width=width + 4, height=height + 2)
+        self.panel_keys[name] = key
+        if self.profiler is not None:
+            self.profiler.record(f'{name}.generate', generated - start)
+            self.profiler.record(f'{name}.panel', time.perf_counter() - generated)
+        return rendered
     
-    def main(self):
+    def _apply_panels(self, layout, rendered):
+        # puts {name: Panel} into the layout, returning the names
+        for name, panel in rendered.items():
+            start = time.perf_counter()
+            layout[name].update(panel)
+            if self.profiler is not None:
+                self.profiler.record(f'{name}.layout', time.perf_counter() - start)
+        return list(rendered)
+    
+    def _update_panel(self, layout, name, title, panel, width, height, *args):
+        # skips regenerating (and re-laying out) a panel whose change key hasn't moved since the last frame
+        rendered = self._render_panel(name, title, panel, width, height, *args)
+        if rendered is None:
+            return False
+        self._apply_panels(layout, {name: rendered})
+        return True
+    
+    def _build_layout(self):
         layout = Layout()
         layout.split_row(
             Layout(name="left", size=self.race_control_messages_ascii_panel_width + 4),
@@ -721,47 +1105,164 @@ class F1AsciiReplayDisplay:
             Layout(name="sector_timing", size=self.sector_timing_ascii_panel_height + 2),
             Layout(name="minimap", size=self.minimap_ascii_panel_height + 2)
         )
-        lap = 1
-        lap_start_dates = self.laps_data['LapStartDate']
-        lap_numbers = self.laps_data['LapNumber']
-        telemetry = self.laps_data.telemetry
-        with Live(layout, screen=False, refresh_per_second=1/self.refresh_rate):
-            for i in range(len(telemetry)): 
-                start_time = datetime.now()
-                clock = telemetry['Date'].iloc[i].to_pydatetime()
-                # checks if time has passed the start time for the next lap, then increments if necessary. relies on lap data to increment.
-                if clock >= lap_start_dates.iloc[lap]:
-                    lap = int(lap_numbers.iloc[lap])
-                
-                driver_view_frame = self.driver_view_ascii_panel.generate_frame(i)
-                lap_data_frame = self.lap_data_ascii_panel.generate_frame(lap)
-                sector_timing_frame = self.sector_timing_ascii_panel.generate_frame(lap, i)
-                telemetry_frame = self.telemetry_ascii_panel.generate_frame(i)
-                minimap_frame = self.minimap_ascii_panel.generate_frame(i)
-                race_control_messages_frame = self.race_control_messages_ascii_panel.generate_frame(i)
-                
-                driver_view_panel = Panel(driver_view_frame, title="Driver View", width=self.driver_view_ascii_panel_width + 4, height=self.driver_view_ascii_panel_height + 2)
-                lap_data_panel = Panel(lap_data_frame, title="Lap Data", width=self.lap_data_ascii_panel_width + 4, height=self.lap_data_ascii_panel_height + 2)
-                sector_timing_panel = Panel(sector_timing_frame, title="Sector Timing", width=self.sector_timing_ascii_panel_width + 4, height=self.sector_timing_ascii_panel_height + 2)
-                telemetry_panel = Panel(telemetry_frame, title="Telemetry", width=self.telemetry_ascii_panel_width + 4, height=self.telemetry_ascii_panel_height + 2)
-                minimap_panel = Panel(minimap_frame, title="Minimap", width=self.minimap_ascii_panel_width + 4, height=self.minimap_ascii_panel_height + 2)
-                race_control_messages_panel = Panel(race_control_messages_frame, title="Race Control", width=self.race_control_messages_ascii_panel_width + 4, height=self.race_control_messages_ascii_panel_height + 2)
-                
-                layout['driver_view'].update(driver_view_panel)
-                layout['sector_timing'].update(sector_timing_panel)
-                layout['lap_data'].update(lap_data_panel)
-                layout['telemetry'].update(telemetry_panel)
-                layout['minimap'].update(minimap_panel)
-                layout['race_control_messages'].update(race_control_messages_panel)
-                
-                # time_delta = (self.telemetry['Date'].iloc[i+1] - self.telemetry['Date'].iloc[i]).total_seconds() - (datetime.now() - start_time).total_seconds()
-                
-                # if time_delta > 0:
-                #     time.sleep(time_delta)
-                
-                elapsed = (datetime.now() - start_time).total_seconds()
-                sleep_time = max(0, self.refresh_rate - elapsed)
-                time.sleep(sleep_time)
+        if self.hud_ascii_panel is not None:
+            layout["right"].add_split(Layout(name="hud", size=self.hud_ascii_panel_height + 2))
+        return layout
+    
+    def _panel_updates(self, i):
+        # (name, title, panel, width, height, args) for every panel that follows the replay, i.e. all but the hud
+        lap = self.lap_index.lap[i]
+        return [
+            ('driver_view', "Driver View", self.driver_view_ascii_panel, self.driver_view_ascii_panel_width, self.driver_view_ascii_panel_height, (i,)),
+            ('lap_data', "Lap Data", self.lap_data_ascii_panel, self.lap_data_ascii_panel_width, self.lap_data_ascii_panel_height, (lap, i)),
+            ('sector_timing', "Sector Timing", self.sector_timing_ascii_panel, self.sector_timing_ascii_panel_width, self.sector_timing_ascii_panel_height, (lap, i)),
+            ('telemetry', "Telemetry", self.telemetry_ascii_panel, self.telemetry_ascii_panel_width, self.telemetry_ascii_panel_height, (i,)),
+            ('minimap', "Minimap", self.minimap_ascii_panel, self.minimap_ascii_panel_width, self.minimap_ascii_panel_height, (i,)),
+            ('race_control_messages', "Race Control", self.race_control_messages_ascii_panel, self.race_control_messages_ascii_panel_width, self.race_control_messages_ascii_panel_height, (i,)),
+        ]
+    
+    def _hud_update(self, layout, i):
+        return self.hud_ascii_panel is not None and self._update_panel(layout, 'hud', "Performance", self.hud_ascii_panel, self.hud_ascii_panel_width, self.hud_ascii_panel_height, i)
+    
+    def render_panels(self, i):
+        # {name: Panel} for the panels that change at sample i, without touching a layout. what a FramePipeline renders ahead.
+        rendered = {}
+        for name, title, panel, width, height, args in self._panel_updates(i):
+            frame = self._render_panel(name, title, panel, width, height, *args)
+            if frame is not None:
+                rendered[name] = frame
+        return rendered
+    
+    def _update_panels(self, layout, i):
+        # names of the panels that were redrawn
+        changed = [name for name, title, panel, width, height, args in self._panel_updates(i) if self._update_panel(layout, name, title, panel, width, height, *args)]
+        if self._hud_update(layout, i):
+            changed.append('hud')
+        return changed
+    
+    def _frame_done(self, clock, frame_start):
+        # sleeps out the rest of the frame, timing both halves if profiling
+        if self.profiler is None:
+            clock.sleep()
+            return
+        sleep_start = time.perf_counter()
+        self.profiler.end_frame(sleep_start - frame_start)
+        clock.sleep()
+        self.profiler.record('sleep', time.perf_counter() - sleep_start)
+        self.profiler.maybe_write_metrics({**self._stats(clock), 'telemetry_cache': self.telemetry_ascii_panel.cache_stats()})
+    
+    def _stats(self, clock):
+        return {**clock.stats(), **self.pipeline.stats()} if self.pipeline is not None else clock.stats()
+    
+    def start_index(self):
+        # sample to start from, from start_lap or start_time (a SessionTime) if either was given
+        if self.start_lap is not None:
+            return self.lap_index.lap_start_sample(self.start_lap)
+        if self.start_time is not None:
+            session_time = self.telemetry_store.session_time
+            return min(int(np.searchsorted(session_time, pd.Timedelta(self.start_time).to_timedelta64(), side='left')), len(session_time) - 1)
+        return 0
+    
+    def seek_lap(self, clock, lap):
+        return clock.seek(self.lap_index.lap_start_sample(lap))
+    
+    def _handle_key(self, key, clock):
+        # ←/→ seek 10s, n/p next/previous lap, a lap number then enter jumps to that lap, +/- speed, d next driver, q quits.
+        # every panel's frame is a function of the sample index, so a seek is just the clock moving.
+        current_lap = self.lap_index.lap[clock.position]
+        if key == 'right':
+            clock.seek_time(SEEK_STEP)
+        elif key == 'left':
+            clock.seek_time(-SEEK_STEP)
+        elif key == 'n':
+            # nothing after the last lap - seeking would clamp back to its start
+            if current_lap < self.lap_index.lap_numbers[-1]:
+                self.seek_lap(clock, current_lap + 1)
+        elif key == 'p':
+            self.seek_lap(clock, current_lap - 1)
+        elif key.isdigit():
+            self.lap_entry += key
+        elif key == 'enter' and self.lap_entry:
+            self.seek_lap(clock, int(self.lap_entry))
+            self.lap_entry = ''
+        elif key == 'escape':
+            self.lap_entry = ''
+        elif key in ('+', '='):
+            clock.set_speed(clock.speed * 2)
+        elif key == '-':
+            clock.set_speed(clock.speed / 2)
+        elif key == 'd':
+            self.focus_driver(self.drivers[(self.drivers.index(self.driver) + 1) % len(self.drivers)])
+        elif key == 'q':
+            self.quit = True
+    
+    def _play(self, clock, layout, draw=None, relayout=None):
+        # draw gets the names of the panels redrawn each frame, for outputs that don't watch the layout themselves. relayout
+        # gets the new layout after the terminal's been resized.
+        self.quit = False
+        self.lap_entry = ''
+        # with pipeline_depth set, the panels are rendered ahead on another thread and this loop only lays out and draws them
+        self.pipeline = FramePipeline(self, clock, self.pipeline_depth) if self.pipeline_depth else None
+        if self.hud_ascii_panel is not None:
+            self.hud_ascii_panel.pipeline = self.pipeline
+        with KeyReader() as keys, self._resize_signal(), self.pipeline or nullcontext():
+            while not clock.finished and not self.quit:
+                frame_start = time.perf_counter()
+                pressed = keys.read()
+                if pressed or self.resize_pending:
+                    # keys and resizes change what the producer's rendering from, so it's held off until they're done
+                    with self.pipeline.paused() if self.pipeline is not None else nullcontext():
+                        for key in pressed:
+                            self._handle_key(key, clock)
+                        if self.resize_pending:
+                            self.resize_pending = False
+                            if self.resize():
+                                layout = self._build_layout()
+                                if relayout is not None:
+                                    relayout(layout)
+                                if self.profiler is not None:
+                                    self.profiler.record('resize', time.perf_counter() - frame_start)
+                i = clock.tick()
+                if self.pipeline is None:
+                    changed = self._update_panels(layout, i)
+                else:
+                    changed = self._apply_panels(layout, self.pipeline.take(i))
+                    if self._hud_update(layout, i):
+                        changed.append('hud')
+                if draw is not None:
+                    draw(changed)
+                self._frame_done(clock, frame_start)
+    
+    def main(self):
+        self.panel_keys = {}
+        layout = self._build_layout()
+        clock = PlaybackClock(self.telemetry_store.session_time, speed=self.playback_speed, target_fps=1/self.refresh_rate, start_index=self.start_index())
+        if self.hud_ascii_panel is not None:
+            self.hud_ascii_panel.clock = clock
+        if self.output == 'delta':
+            output = DeltaTerminalOutput(self.terminal_width, self.terminal_height)
+            regions = output.regions(layout)
+            
+            def draw(changed):
+                # only the panels that were redrawn get re-rendered and diffed
+                for name in changed:
+                    output.draw(layout[name].renderable, regions[name])
+                output.flush()
+            
+            def relayout(new_layout):
+                nonlocal layout
+                layout = new_layout
+                output.resize(self.terminal_width, self.terminal_height)
+                regions.update(output.regions(layout))
+            
+            with output:
+                self._play(clock, layout, draw, relayout)
+            return {**self._stats(clock), **output.stats()}
+        
+        with Live(layout, screen=False, refresh_per_second=1/self.refresh_rate) as live:
+            self._play(clock, layout, relayout=live.update)
+        
+        return self._stats(clock)
 
 if __name__ == "__main__":
     telemetry_loader = TelemetryLoader(2025, 'Silverstone', 'R')
@@ -769,7 +1270,9 @@ if __name__ == "__main__":
     display = F1AsciiReplayDisplay(
         telemetry_loader=telemetry_loader,
         racetrack_database_loader=racetrack_database_loader,
-        refresh_rate=1/30
+        refresh_rate=1/30,
+        playback_speed=1.0
     )
-    display.main()
+    stats = display.main()
+    print(f"{stats['achieved_fps']:.1f}/{stats['target_fps']:.0f} fps at {stats['speed']}x, {stats['samples_dropped']} samples dropped, {stats['late_frames']} late frames")
 
@@ -0,0 +1,157 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class FramePipeline:
+    def __init__(self, display, clock, depth=4):
+        # a producer thread renders the display's panels for the samples the clock is about to reach, into a ring buffer of
+        # up to [depth] frames. the main loop takes them as the clock gets there, so a slow frame (a new lap, a burst of race
+        # control messages) is soaked up by the frames already waiting instead of holding up the screen.
+        self.display = display
+        self.clock = clock
+        self.depth = depth
+
+        # (sample index, {panel name: Panel}) oldest first. only panels whose frame key moved are in each one.
+        self._frames = deque()
+        self._condition = threading.Condition()
+        # held while the producer renders, and by paused() while the display's state is changed under it
+        self._render_lock = threading.Lock()
+        self._generation = 0
+        self._next_time = None
+        self._last_index = None
+        self._shown = None
+        self._stopped = False
+        self._error = None
+        self._thread = None
+
+        self.produced = 0
+        self.skipped = 0
+        self.underruns = 0
+        self.full_waits = 0
+        self.max_fill = 0
+        self._fill_total = 0
+        self._takes = 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='frame-producer', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def fill(self):
+        return len(self._frames)
+
+    def _next_index(self):
+        # the sample for the next frame slot: a frame period on from the last one, or the clock's time now if the producer
+        # has fallen behind it. never the same sample twice - at slow speeds that would only fill the buffer with repeats.
+        clock = self.clock
+        now = clock.replay_time()
+        if self._next_time is None or self._next_time < now:
+            self._next_time = now
+        i = int(np.searchsorted(clock.sample_times, self._next_time, side='right')) - 1
+        i = min(max(i, clock.start_index), len(clock.sample_times) - 1)
+        if self._last_index is not None and i <= self._last_index:
+            i = self._last_index + 1
+        self._next_time += int(clock.frame_period * clock.speed * 1e9)
+        return i
+
+    def _run(self):
+        last_sample = len(self.clock.sample_times) - 1
+        try:
+            while True:
+                with self._condition:
+                    # backpressure: wait for the main loop to make room. also idles once the last sample's been rendered.
+                    if len(self._frames) >= self.depth:
+                        self.full_waits += 1
+                    while not self._stopped and (len(self._frames) >= self.depth or self._last_index == last_sample):
+                        self._condition.wait()
+                    if self._stopped:
+                        return
+                    generation = self._generation
+                    i = self._next_index()
+
+                with self._render_lock:
+                    if generation != self._generation:
+                        continue
+                    rendered = self.display.render_panels(i)
+
+                with self._condition:
+                    # anything rendered for before a seek/driver change/resize is thrown away
+                    if generation == self._generation:
+                        self._frames.append((i, rendered))
+                        self._last_index = i
+                        self.produced += 1
+                        self._condition.notify_all()
+        except BaseException as error:
+            with self._condition:
+                self._error = error
+                self._condition.notify_all()
+
+    def take(self, i):
+        # the panel updates for the newest rendered sample at or before i, with those of any older ones it skips folded in
+        with self._condition:
+            if self._shown is None:
+                # the first frame (and the first after a restart) waits for the producer rather than leaving the screen as it was
+                self._condition.wait_for(lambda: self._frames or self._error is not None, timeout=1.0)
+            if self._error is not None:
+                raise self._error
+
+            self._takes += 1
+            self._fill_total += len(self._frames)
+            self.max_fill = max(self.max_fill, len(self._frames))
+
+            rendered = {}
+            taken = 0
+            while self._frames and self._frames[0][0] <= i:
+                self._shown, frames = self._frames.popleft()
+                rendered.update(frames)
+                taken += 1
+            if taken:
+                self.skipped += taken - 1
+                self._condition.notify_all()
+            elif not self._frames and (self._shown is None or self._shown < i):
+                # the clock has moved on and there's nothing ready for it
+                self.underruns += 1
+            return rendered
+
+    @contextmanager
+    def paused(self):
+        # holds the producer off while the display or clock is changed (seeks, speed, driver, resize), then starts it again
+        # from the clock's new position with everything redrawn
+        with self._render_lock:
+            try:
+                yield
+            finally:
+                with self._condition:
+                    self._generation += 1
+                    self._frames.clear()
+                    self._next_time = None
+                    self._last_index = None
+                    self._shown = None
+                    self.display.panel_keys = {}
+                    self._condition.notify_all()
+
+    def stats(self):
+        return {
+            'pipeline_depth': self.depth,
+            'pipeline_produced': self.produced,
+            'pipeline_skipped': self.skipped,
+            'pipeline_underruns': self.underruns,
+            'pipeline_full_waits': self.full_waits,
+            'pipeline_mean_fill': self._fill_total / self._takes if self._takes else 0.0,
+            'pipeline_max_fill': self.max_fill,
+        }
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+
+MIN_SPEED = 0.25
+MAX_SPEED = 16.0
+
+
+def _to_ns(values):
+    # timedelta/datetime column -> int64 nanoseconds
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'mM':
+        return arr.astype(f'{arr.dtype.kind}8[ns]').view(np.int64)
+    return arr.astype(np.int64)
+
+
+def frame_indices(sample_times, fps=30.0, speed=1.0, start_index=0):
+    # the sample index for every frame of a replay rendered at a fixed frame rate - what PlaybackClock.tick() would return
+    # if every frame took exactly 1/fps. for rendering offline, where there's no wall clock to keep up with.
+    sample_times = _to_ns(sample_times)
+    start, end = sample_times[start_index], sample_times[-1]
+    step = speed / fps * 1e9
+    replay_times = start + (np.arange(int((end - start) / step) + 1) * step).astype(np.int64)
+    indices = np.searchsorted(sample_times, replay_times, side='right') - 1
+    if indices[-1] != len(sample_times) - 1:
+        indices = np.append(indices, len(sample_times) - 1)
+    return np.maximum(indices, start_index)
+
+
+class PlaybackClock:
+    def __init__(self, sample_times, speed=1.0, target_fps=30.0, start_index=0):
+        # sample_times is the telemetry SessionTime (or Date) column. the replay clock runs off these, not off the render rate.
+        self.sample_times = _to_ns(sample_times)
+        self.target_fps = target_fps
+        self.frame_period = 1 / target_fps
+        self.speed = min(max(speed, MIN_SPEED), MAX_SPEED)
+
+        self.start_index = start_index
+        self.index = start_index - 1
+        self.finished = len(self.sample_times) == 0
+
+        self.frames_rendered = 0
+        self.samples_dropped = 0
+        self.late_frames = 0
+        self._created = None
+        self._wall_start = None
+        self._replay_start = self.sample_times[start_index] if len(self.sample_times) else 0
+        self._tick_start = None
+
+    def _anchor(self, replay_time):
+        self._wall_start = time.monotonic()
+        self._replay_start = replay_time
+
+    def replay_time(self):
+        if self._wall_start is None:
+            return self._replay_start
+        return self._replay_start + int((time.monotonic() - self._wall_start) * self.speed * 1e9)
+
+    def set_speed(self, speed):
+        # re-anchor on the current replay time so changing speed doesn't make playback jump
+        replay_time = self.replay_time()
+        self.speed = min(max(speed, MIN_SPEED), MAX_SPEED)
+        if self._wall_start is not None:
+            self._anchor(replay_time)
+
+    @property
+    def position(self):
+        # the sample on screen, or the one about to be after a seek
+        return max(self.index, self.start_index)
+
+    def seek(self, index):
+        # jump to any sample, backwards included. the replay clock carries on from there at the same speed.
+        index = min(max(int(index), 0), len(self.sample_times) - 1)
+        self.start_index = index
+        self.index = index - 1
+        self.finished = False
+        if self._wall_start is None:
+            self._replay_start = self.sample_times[index]
+        else:
+            self._anchor(self.sample_times[index])
+        return index
+
+    def seek_time(self, seconds):
+        # seek relative to the current replay time
+        current = self.sample_times[self.position]
+        return self.seek(np.searchsorted(self.sample_times, current + int(seconds * 1e9), side='left'))
+
+    def tick(self):
+        # sample index to render this frame. if rendering fell behind, samples are skipped rather than the race slowing down.
+        # if rendering is ahead of the data, the same sample comes back again (and the panels' frame keys skip the work).
+        if self._wall_start is None:
+            self._anchor(self._replay_start)
+            self._created = self._wall_start
+        self._tick_start = time.monotonic()
+
+        i = int(np.searchsorted(self.sample_times, self.replay_time(), side='right')) - 1
+        i = min(max(i, self.start_index, self.index), len(self.sample_times) - 1)
+
+        self.samples_dropped += max(0, i - self.index - 1)
+        self.frames_rendered += 1
+        self.index = i
+        if i == len(self.sample_times) - 1:
+            self.finished = True
+        return i
+
+    def sleep(self):
+        # wait out the rest of this frame's time slot
+        elapsed = time.monotonic() - self._tick_start
+        if elapsed > self.frame_period:
+            self.late_frames += 1
+        else:
+            time.sleep(self.frame_period - elapsed)
+
+    def stats(self):
+        wall = time.monotonic() - self._created if self._created is not None else 0.0
+        return {
+            'target_fps': self.target_fps,
+            'achieved_fps': self.frames_rendered / wall if wall > 0 else 0.0,
+            'speed': self.speed,
+            'frames_rendered': self.frames_rendered,
+            'samples_dropped': self.samples_dropped,
+            'late_frames': self.late_frames,
+        }
@@ -0,0 +1,160 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from telemetry_store import TelemetryStore
+from track_matching import driver_track_index, register_telemetry
+
+
+class PreparedReplay:
+    # everything F1AsciiReplayDisplay builds its panels from, already loaded, merged and resampled
+    def __init__(self, key, telemetry_store, track_data, corners, race_control_messages, gmt_offset, tel_to_track=None, track_idx=None):
+        self.key = key
+        self.telemetry_store = telemetry_store
+        self.track_data = track_data
+        self.corners = corners
+        self.race_control_messages = race_control_messages
+        self.gmt_offset = gmt_offset
+        # the minimap's telemetry -> track affine and each driver view's {driver: track index}. None leaves them to the panels.
+        self.tel_to_track = tel_to_track
+        self.track_idx = track_idx
+
+
+def _replay_key(telemetry_loader):
+    return (telemetry_loader.year, telemetry_loader.gp, telemetry_loader.identifier)
+
+
+def prepare_replay(telemetry_loader, racetrack_database_loader, drivers):
+    # the whole load, done in whichever process calls it. the first driver's session-wide data (corners, messages) is used.
+    # matching the cars onto the track is done here too, since it's the slow part of building the panels.
+    replay_data = telemetry_loader.get_replay_data_for_drivers(drivers)
+    first = replay_data[drivers[0]]
+    telemetry_store = TelemetryStore({driver: replay_data[driver].laps for driver in drivers})
+    track_data = racetrack_database_loader.get_track_data()
+    return PreparedReplay(
+        key=_replay_key(telemetry_loader),
+        telemetry_store=telemetry_store,
+        track_data=track_data,
+        corners=first.corners,
+        race_control_messages=first.race_control_messages,
+        gmt_offset=first.gmt_offset,
+        tel_to_track=register_telemetry(telemetry_store.channels['X'][telemetry_store.present], telemetry_store.channels['Y'][telemetry_store.present], track_data),
+        track_idx={driver: driver_track_index(telemetry_store.telemetry(driver), track_data) for driver in drivers}
+    )
+
+
+def _share_array(array):
+    # copies the array into a new shared memory block. only (name, shape, dtype) needs pickling back to the parent.
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    shm.close()
+    return (shm.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec, blocks):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    blocks.append(shm)
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _unlink_array(spec):
+    try:
+        shm = shared_memory.SharedMemory(name=spec[0])
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class SharedReplay:
+    # picklable form of a PreparedReplay. the telemetry store's arrays stay in shared memory, everything else is small enough to pickle.
+    def __init__(self, prepared):
+        store = prepared.telemetry_store
+        self.key = prepared.key
+        # laps tables only - the raw telemetry they carry has already been resampled into the store
+        self.laps_by_driver = {driver: pd.DataFrame(laps) for driver, laps in store.laps_by_driver.items()}
+        self.arrays = {
+            'session_time': _share_array(store.session_time),
+            'date': _share_array(store.date),
+            'present': _share_array(store.present),
+        }
+        self.channels = {channel: _share_array(values) for channel, values in store.channels.items()}
+        self.track_data = np.array(prepared.track_data)
+        self.corners = prepared.corners
+        self.race_control_messages = prepared.race_control_messages
+        self.gmt_offset = prepared.gmt_offset
+        self.tel_to_track = prepared.tel_to_track
+        self.track_idx = {driver: _share_array(idx) for driver, idx in (prepared.track_idx or {}).items()}
+
+    def _specs(self):
+        return list(self.arrays.values()) + list(self.channels.values()) + list(self.track_idx.values())
+
+    def attach(self):
+        # maps the blocks into this process (no copy) and unlinks their names straight away, so nothing is left behind in /dev/shm
+        # even if the replay crashes. the memory itself lives on until the store is garbage collected.
+        blocks = []
+        arrays = {name: _attach_array(spec, blocks) for name, spec in self.arrays.items()}
+        channels = {channel: _attach_array(spec, blocks) for channel, spec in self.channels.items()}
+        track_idx = {driver: _attach_array(spec, blocks) for driver, spec in self.track_idx.items()}
+        for shm in blocks:
+            shm.unlink()
+        telemetry_store = TelemetryStore.from_arrays(self.laps_by_driver, channels=channels, **arrays)
+        telemetry_store._shared_memory = blocks
+        return PreparedReplay(self.key, telemetry_store, self.track_data, self.corners, self.race_control_messages, self.gmt_offset, self.tel_to_track, track_idx or None)
+
+    def unlink(self):
+        # for results that are never attached
+        for spec in self._specs():
+            _unlink_array(spec)
+
+
+def _prepare_shared_replay(telemetry_loader, racetrack_database_loader, drivers):
+    # runs in the pool worker
+    return SharedReplay(prepare_replay(telemetry_loader, racetrack_database_loader, drivers))
+
+
+class SessionPrefetcher:
+    def __init__(self, max_workers=1):
+        # loads upcoming sessions in worker processes while the current one is replaying. spawn rather than fork, since the
+        # replay has rich's refresh thread running.
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        self._futures = {}
+
+    def prefetch(self, telemetry_loader, racetrack_database_loader, drivers):
+        # starts loading (year, gp, identifier) in the background, if it isn't already. the loaders are pickled over to the
+        # worker, so any loader that pickles works (e.g. one backed by a local fixture session).
+        key = _replay_key(telemetry_loader)
+        if key not in self._futures:
+            self._futures[key] = self._pool.submit(_prepare_shared_replay, telemetry_loader, racetrack_database_loader, list(drivers))
+        return key
+
+    def ready(self, key):
+        return key in self._futures and self._futures[key].done()
+
+    def get(self, key, timeout=None):
+        # PreparedReplay for a prefetched session, blocking until it's loaded. worker exceptions are re-raised here. a timeout
+        # leaves the session prefetching, so get can be called for it again (or close cleans it up).
+        shared = self._futures[key].result(timeout)
+        del self._futures[key]
+        return shared.attach()
+
+    def close(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._pool.shutdown(wait=True)
+        # anything that was loaded but never picked up
+        for future in self._futures.values():
+            if not future.cancelled() and future.exception() is None:
+                future.result().unlink()
+        self._futures = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
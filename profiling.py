@@ -0,0 +1,92 @@
+import bisect
+import json
+import threading
+import time
+from collections import deque
+
+# histogram bin edges in ms, log spaced from 10µs up to ~700ms
+BIN_EDGES_MS = [0.01 * 1.25 ** k for k in range(51)]
+
+
+class RollingHistogram:
+    def __init__(self, window=300):
+        # counts per bin over the last [window] samples. adding a sample is O(1) - the one falling out of the window is
+        # taken back off its bin.
+        self.window = window
+        self.counts = [0] * (len(BIN_EDGES_MS) + 1)
+        self.values = deque()
+        self.bins = deque()
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, ms):
+        b = bisect.bisect_left(BIN_EDGES_MS, ms)
+        self.counts[b] += 1
+        self.bins.append(b)
+        self.values.append(ms)
+        self.total += ms
+        if len(self.values) > self.window:
+            self.counts[self.bins.popleft()] -= 1
+            self.total -= self.values.popleft()
+
+    def percentile(self, q):
+        # upper edge of the bin the q-th percentile falls in, so accurate to a bin (25%). never more than the window's max,
+        # which the top bin's edge can overshoot.
+        if not self.values:
+            return 0.0
+        largest = max(self.values)
+        target = q / 100 * len(self.values)
+        seen = 0
+        for b, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(BIN_EDGES_MS[b], largest) if b < len(BIN_EDGES_MS) else largest
+        return largest
+
+    def summary(self):
+        n = len(self.values)
+        return {
+            'count': n,
+            'mean_ms': self.total / n if n else 0.0,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+            'max_ms': max(self.values) if n else 0.0,
+        }
+
+
+class FrameProfiler:
+    def __init__(self, window=300, metrics_path=None, metrics_interval=1.0):
+        # per-section timings (seconds in, ms out) over the last [window] frames. if metrics_path is set, a summary is
+        # appended to it as one json line every [metrics_interval] seconds.
+        self.window = window
+        self.sections = {}
+        self.frames = 0
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self._last_metrics = time.monotonic()
+        # sections are recorded from the frame pipeline's producer thread as well as the main loop
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self.sections:
+                self.sections[name] = RollingHistogram(self.window)
+            self.sections[name].add(seconds * 1e3)
+
+    def end_frame(self, seconds):
+        self.frames += 1
+        self.record('frame', seconds)
+
+    def summary(self):
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in self.sections.items()}
+
+    def maybe_write_metrics(self, clock_stats):
+        if self.metrics_path is None or time.monotonic() - self._last_metrics < self.metrics_interval:
+            return False
+        self._last_metrics = time.monotonic()
+        with open(self.metrics_path, 'a') as f:
+            f.write(json.dumps({'time': time.time(), 'frames': self.frames, **clock_stats, 'sections': self.summary()}) + '\n')
+        return True
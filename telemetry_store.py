@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from loaders import ReplayLaps
+
+# channels that are interpolated between samples vs. held from the last sample
+CONTINUOUS_CHANNELS = ['X', 'Y', 'Speed', 'RPM', 'Throttle']
+DISCRETE_CHANNELS = ['Brake', 'nGear', 'DRS']
+
+
+def _ns(column):
+    return np.asarray(column, dtype='m8[ns]').view(np.int64)
+
+
+class TelemetryStore:
+    def __init__(self, laps_by_driver, step=None):
+        # laps_by_driver: {driver: laps with merged .telemetry}. every channel ends up as one (drivers, samples) array on a shared SessionTime grid.
+        self.drivers = list(laps_by_driver)
+        self.driver_idx = {driver: d for d, driver in enumerate(self.drivers)}
+        self.laps_by_driver = laps_by_driver
+        telemetry = [laps_by_driver[driver].telemetry for driver in self.drivers]
+        times = [_ns(tel['SessionTime']) for tel in telemetry]
+
+        # grid spacing defaults to the typical telemetry interval across all cars
+        if step is None:
+            step = int(np.median(np.concatenate([np.diff(t) for t in times if len(t) > 1])))
+        else:
+            step = int(pd.Timedelta(step).value)
+        start = min(t[0] for t in times)
+        end = max(t[-1] for t in times)
+        grid = start + np.arange((end - start) // step + 1, dtype=np.int64) * step
+        self.session_time = grid.view('m8[ns]')
+
+        # Date - SessionTime is a constant offset for the session
+        first = telemetry[0]
+        date_offset = np.asarray(first['Date'], dtype='M8[ns]')[0].astype(np.int64) - times[0][0]
+        self.date = (grid + date_offset).view('M8[ns]')
+
+        n_drivers, n_samples = len(self.drivers), len(grid)
+        # whether the car has telemetry at this point (before its first/after its last sample it's held at the edge value)
+        self.present = np.zeros((n_drivers, n_samples), dtype=bool)
+        self.channels = {}
+        for channel in CONTINUOUS_CHANNELS:
+            self.channels[channel] = np.empty((n_drivers, n_samples), dtype=np.float64)
+        for channel in DISCRETE_CHANNELS:
+            self.channels[channel] = np.empty((n_drivers, n_samples), dtype=np.asarray(first[channel]).dtype)
+
+        for d, (tel, t) in enumerate(zip(telemetry, times)):
+            self.present[d] = (grid >= t[0]) & (grid <= t[-1])
+            for channel in CONTINUOUS_CHANNELS:
+                self.channels[channel][d] = np.interp(grid, t, np.asarray(tel[channel], dtype=np.float64))
+            held = np.clip(np.searchsorted(t, grid, side='right') - 1, 0, len(t) - 1)
+            for channel in DISCRETE_CHANNELS:
+                self.channels[channel][d] = np.asarray(tel[channel])[held]
+
+        self._telemetry_cache = {}
+
+    @classmethod
+    def from_arrays(cls, laps_by_driver, session_time, date, present, channels):
+        # a store around arrays that were already resampled somewhere else (e.g. a prefetch worker), so nothing is redone here
+        store = cls.__new__(cls)
+        store.drivers = list(laps_by_driver)
+        store.driver_idx = {driver: d for d, driver in enumerate(store.drivers)}
+        store.laps_by_driver = laps_by_driver
+        store.session_time = session_time
+        store.date = date
+        store.present = present
+        store.channels = channels
+        store._telemetry_cache = {}
+        return store
+
+    def __len__(self):
+        return len(self.session_time)
+
+    def telemetry(self, driver):
+        # one driver's slice of the store in the same shape as fastf1's merged telemetry, built once per driver
+        if driver not in self._telemetry_cache:
+            d = self.driver_idx[driver]
+            columns = {channel: values[d] for channel, values in self.channels.items()}
+            columns['Date'] = self.date
+            columns['SessionTime'] = self.session_time
+            self._telemetry_cache[driver] = pd.DataFrame(columns)
+        return self._telemetry_cache[driver]
+
+    def laps(self, driver):
+        # the driver's laps table with the resampled telemetry attached, for the panels
+        laps = ReplayLaps(self.laps_by_driver[driver])
+        laps.telemetry = self.telemetry(driver)
+        return laps
@@ -0,0 +1,122 @@
+import sys
+
+from rich.console import COLOR_SYSTEMS, Console
+
+ENTER_SCREEN = '\x1b[?1049h\x1b[?25l\x1b[2J'
+EXIT_SCREEN = '\x1b[0m\x1b[?25h\x1b[?1049l'
+
+
+class DeltaTerminalOutput:
+    def __init__(self, width, height, file=None, console=None, max_gap=6):
+        # alternative to rich's Live: diffs each composed frame against what's already on screen and only writes the cells
+        # that changed, each run behind a cursor move. unchanged gaps shorter than max_gap cells are rewritten rather than jumped over,
+        # since the cursor move costs about as many bytes.
+        self.width = width
+        self.height = height
+        self.file = file or sys.stdout
+        self.console = console or Console(width=width, height=height, file=self.file)
+        self.max_gap = max_gap
+        color_system = self.console.color_system
+        self._color_system = COLOR_SYSTEMS[color_system] if color_system else None
+
+        # what's on screen, one (char, style) per cell. starts blank to match the cleared screen.
+        self._cells = [[(' ', None)] * width for _ in range(height)]
+        self._pending = []
+
+        self.frames = 0
+        self.bytes_written = 0
+        self.last_frame_bytes = 0
+
+    def __enter__(self):
+        self._write(ENTER_SCREEN)
+        return self
+
+    def __exit__(self, *exc):
+        self._write(EXIT_SCREEN)
+
+    def _write(self, text):
+        self.file.write(text)
+        self.file.flush()
+        n_bytes = len(text.encode('utf-8'))
+        self.bytes_written += n_bytes
+        return n_bytes
+
+    def _line_cells(self, line):
+        cells = []
+        for segment in line:
+            if not segment.control:
+                cells.extend((char, segment.style) for char in segment.text)
+        return cells
+
+    def _render_cells(self, cells):
+        # one escape sequence per run of equal style
+        out = []
+        start = 0
+        for end in range(1, len(cells) + 1):
+            if end == len(cells) or cells[end][1] != cells[start][1]:
+                text = ''.join(char for char, _ in cells[start:end])
+                style = cells[start][1]
+                out.append(style.render(text, color_system=self._color_system) if style and self._color_system else text)
+                start = end
+        return ''.join(out)
+
+    def _changed_runs(self, cells, previous):
+        # (start, end) of every run of changed cells, with short unchanged gaps folded in
+        changed = [col >= len(previous) or cell != previous[col] for col, cell in enumerate(cells)]
+        runs = []
+        col = 0
+        while col < len(changed):
+            if not changed[col]:
+                col += 1
+                continue
+            start = col
+            end = col + 1
+            col += 1
+            while col < len(changed) and col - end < self.max_gap:
+                if changed[col]:
+                    end = col + 1
+                col += 1
+            runs.append((start, end))
+            col = end
+        return runs
+
+    def resize(self, width, height):
+        # after the terminal's been resized what's on screen can't be trusted, so it's cleared and the next frame is drawn in full
+        self.width = width
+        self.height = height
+        self.console.size = (width, height)
+        self._cells = [[(' ', None)] * width for _ in range(height)]
+        self._pending = ['\x1b[2J']
+
+    def regions(self, layout):
+        # {name: region} for every named part of a rich Layout, so its panels can be drawn on their own
+        options = self.console.options.update_dimensions(self.width, self.height)
+        return {part.name: render.region for part, render in layout.render(self.console, options).items() if part.name}
+
+    def draw(self, renderable, region=None):
+        # diffs the renderable against what's on screen in its region (the whole screen by default) and queues the changes
+        x, y, width, height = region or (0, 0, self.width, self.height)
+        options = self.console.options.update_dimensions(width, height)
+        for row, line in enumerate(self.console.render_lines(renderable, options, pad=True), start=y):
+            cells = self._line_cells(line)
+            previous = self._cells[row][x:x + width]
+            if cells == previous:
+                continue
+            for start, end in self._changed_runs(cells, previous):
+                self._pending.append(f'\x1b[{row + 1};{x + start + 1}H')
+                self._pending.append(self._render_cells(cells[start:end]))
+            self._cells[row][x:x + len(cells)] = cells
+
+    def flush(self):
+        # writes everything drawn since the last flush as one frame. returns the bytes written.
+        self.frames += 1
+        self.last_frame_bytes = self._write(''.join(self._pending)) if self._pending else 0
+        self._pending = []
+        return self.last_frame_bytes
+
+    def stats(self):
+        return {
+            'output_frames': self.frames,
+            'bytes_written': self.bytes_written,
+            'bytes_per_frame': self.bytes_written / self.frames if self.frames else 0.0,
+        }
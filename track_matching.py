@@ -0,0 +1,108 @@
+import numpy as np
+
+
+def track_arc_length(track_data):
+    # cumulative arc length along the centreline, and the lap length including the closing segment back to the start line
+    x_track, y_track = track_data['x_m'], track_data['y_m']
+    seg = np.hypot(np.diff(x_track, append=x_track[0]), np.diff(y_track, append=y_track[0]))
+    if 's_m' in track_data.dtype.names:
+        arc_length = np.asarray(track_data['s_m'])
+    else:
+        arc_length = np.concatenate(([0.0], np.cumsum(seg[:-1])))
+    return arc_length, arc_length[-1] + seg[-1]
+
+
+def nearest_track_points(x, y, x_track, y_track, chunk_size=512):
+    # brute force over the whole track, chunked so it doesn't eat all the memory. (index, squared distance) per point.
+    idx = np.empty(len(x), dtype=np.intp)
+    dist2 = np.empty(len(x))
+    for start in range(0, len(x), chunk_size):
+        d2 = (x[start:start + chunk_size, None] - x_track) ** 2 + (y[start:start + chunk_size, None] - y_track) ** 2
+        idx[start:start + chunk_size] = np.argmin(d2, axis=1)
+        dist2[start:start + chunk_size] = d2[np.arange(len(d2)), idx[start:start + chunk_size]]
+    return idx, dist2
+
+
+def bounding_box_to_track(x_car, y_car, x_track, y_track):
+    # telemetry X/Y (decimetres) -> track metres by lining up the two bounding boxes. rough, but what the driver view has always used.
+    x_car, y_car = x_car / 10, y_car / 10
+    x_scale = (x_track.max() - x_track.min()) / (x_car.max() - x_car.min())
+    y_scale = (y_track.max() - y_track.min()) / (y_car.max() - y_car.min())
+    return (
+        x_track.min() + (x_car - x_car.min()) * x_scale,
+        y_track.min() + (y_car - y_car.min()) * y_scale
+    )
+
+
+def follow_track(x, y, track_data, block_size=32, margin=50.0, jump_distance=50.0):
+    # nearest track point for every sample of one car (already in track metres), followed along the lap instead of searched for
+    # over the whole track. each block of samples only looks at the stretch of track around where the last block ended up, as far
+    # either way as the car travelled plus [margin] metres, so it's O(samples) and a car can't snap onto a parallel bit of track
+    # further round the lap. one full search seeds it, and redoes any sample that's more than [jump_distance] metres off its match
+    # (a gap in the telemetry, the pit lane) or landed on the end of its stretch, so the next block carries on from there.
+    x_track, y_track = track_data['x_m'], track_data['y_m']
+    arc_length, track_length = track_arc_length(track_data)
+    n_track = len(x_track)
+    n_samples = len(x)
+
+    step = np.hypot(np.diff(x), np.diff(y))
+    travelled = np.concatenate(([0.0], np.cumsum(np.where(np.isfinite(step), step, 0.0))))
+    arc_around = np.concatenate((arc_length - track_length, arc_length, arc_length + track_length))
+    starts = np.arange(0, n_samples, block_size)
+    ends = np.minimum(starts + block_size, n_samples)
+    reach = travelled[ends - 1] - travelled[np.maximum(starts - 1, 0)] + margin
+
+    track_idx = np.empty(n_samples, dtype=np.intp)
+    previous = nearest_track_points(x[:1], y[:1], x_track, y_track)[0][0]
+    for start, end, r in zip(starts.tolist(), ends.tolist(), reach.tolist()):
+        centre = arc_length[previous]
+        lo = np.searchsorted(arc_around, centre - r)
+        hi = min(np.searchsorted(arc_around, centre + r), lo + n_track)
+        window = np.arange(lo, hi) % n_track
+        cx, cy = x[start:end], y[start:end]
+        d2 = (cx[:, None] - x_track[window]) ** 2 + (cy[:, None] - y_track[window]) ** 2
+        best = d2.argmin(axis=1)
+        idx = window[best]
+        jumped = (d2[np.arange(end - start), best] > jump_distance ** 2) | (best == 0) | (best == hi - lo - 1)
+        if jumped.any():
+            idx[jumped] = nearest_track_points(cx[jumped], cy[jumped], x_track, y_track)[0]
+        track_idx[start:end] = idx
+        previous = idx[-1]
+    return track_idx
+
+
+def driver_track_index(telemetry, track_data):
+    # the driver view's track index for one car, from its merged telemetry
+    x, y = bounding_box_to_track(telemetry['X'].to_numpy(), telemetry['Y'].to_numpy(), track_data['x_m'], track_data['y_m'])
+    return follow_track(x, y, track_data)
+
+
+def register_telemetry(x, y, track_data, n_iterations=10, max_points=2000):
+    # least squares affine map (3x2, applied to [x, y, 1]) from telemetry X/Y onto the track's x_m/y_m, fitted to every car's
+    # samples at once. starts from lining up the bounding boxes, then alternates matching each sample to its nearest track
+    # point and refitting. keeps the best fit.
+    x_track, y_track = track_data['x_m'], track_data['y_m']
+    step = max(1, len(x) // max_points)
+    points = np.column_stack((x[::step], y[::step], np.ones(len(x[::step]))))
+    track_xy = np.column_stack((x_track, y_track))
+
+    x_scale = (x_track.max() - x_track.min()) / (x.max() - x.min())
+    y_scale = (y_track.max() - y_track.min()) / (y.max() - y.min())
+    affine = np.array([
+        [x_scale, 0.0],
+        [0.0, y_scale],
+        [x_track.min() - x.min() * x_scale, y_track.min() - y.min() * y_scale],
+    ])
+    initial_area = abs(np.linalg.det(affine[:2]))
+    best, best_error = affine, np.inf
+    for _ in range(n_iterations):
+        fitted = points @ affine
+        idx, dist2 = nearest_track_points(fitted[:, 0], fitted[:, 1], x_track, y_track)
+        error = dist2.mean()
+        if error < best_error:
+            best, best_error = affine, error
+        affine = np.linalg.lstsq(points, track_xy[idx], rcond=None)[0]
+        # a fit that shrinks the cars onto part of the track can look better than the real thing - stop before that happens
+        if not 0.8 < abs(np.linalg.det(affine[:2])) / initial_area < 1.25:
+            break
+    return best